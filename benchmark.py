@@ -0,0 +1,566 @@
+# benchmark.py
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import cv2
+import numpy as np
+import pytesseract
+
+from code_mixed import (HashedLanguageModel, build_hashed_model, build_language_model, identify_language,
+                        identify_languages, load_language_model, process_mixed_corpus, read_language_model,
+                        resolve_path, save_language_model, tag_sentences)
+from ocr import binarize, find_text_regions, load_page_at_dpi, ocr_page, ocr_page_regions, preprocess_image
+from spell_correction import SpellIndex, grapheme_clusters
+import stt
+from stemmer import Stemmer
+import translate
+from transliteration import (detect_script, devanagari_to_roman_transliterate, mixed_transliterate,
+                             roman_to_devanagari_transliterate, text_transliterate)
+
+# Text sizes (in words) and page scales used by the scaling suite
+TEXT_SIZES = (1000, 10000, 100000)
+IMAGE_SCALES = (0.5, 1.0, 2.0)
+
+# A4 at 150 DPI, scaled by IMAGE_SCALES
+PAGE_SHAPE = (1754, 1240)
+
+# Relative ops/sec drop reported as a regression by --compare
+REGRESSION_TOLERANCE = 0.2
+
+# Spell-correction lookups/sec expected at edit distance 2 on a 50,000-word lexicon
+SPELL_LOOKUP_TARGET = 5000
+
+# Building blocks for synthetic Roman-script Maithili words
+_ONSETS = ["k", "kh", "g", "gh", "ch", "chh", "j", "jh", "t", "th", "d", "dh", "n", "p", "ph",
+           "b", "bh", "m", "y", "r", "l", "v", "sh", "s", "h", "ksh", "tr"]
+_VOWELS = ["a", "aa", "i", "ii", "u", "uu", "e", "ai", "o", "au"]
+
+def _timed(func, *args):
+    """Runs func once and returns (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def bench_identify_languages(n_tokens=200000, seed=0):
+    """Compares the per-word language-ID loop against the batch API."""
+    model = load_language_model()
+    eng_bigrams, maithili_bigrams = model["eng"], model["maithili"]
+
+    vocab = sorted({word for table in ("eng_corpus.txt", "maithili_corpus.txt", "mixed_corpus.txt")
+                    for word in open(resolve_path(table), encoding='utf-8').read().split()})
+    rng = random.Random(seed)
+    tokens = [rng.choice(vocab) for _ in range(n_tokens)]
+
+    loop_labels, loop_time = _timed(
+        lambda: [identify_language(word, eng_bigrams, maithili_bigrams) for word in tokens])
+    identify_languages(tokens[:10])  # Compile the bigram index outside the timing
+    batch_labels, batch_time = _timed(identify_languages, tokens)
+
+    assert list(batch_labels) == loop_labels, "Batch labels differ from identify_language"
+
+    print(f"identify_language loop : {n_tokens / loop_time:12,.0f} tokens/sec")
+    print(f"identify_languages     : {n_tokens / batch_time:12,.0f} tokens/sec")
+    print(f"speedup                : {loop_time / batch_time:12.2f}x")
+
+def bench_sequence_tagging(n_words=200000, seed=0):
+    """Compares tag_sentences with the per-word and batch language ID on
+    code-mixed lines: tokens/sec, and accuracy against the generator's labels
+    (Unknown counts as wrong)."""
+    model = load_language_model()
+    eng_bigrams, maithili_bigrams = model["eng"], model["maithili"]
+    text, truth = generate_code_mixed_text(n_words, seed, with_labels=True)
+    sentences = [line.split() for line in text.splitlines()]
+    tokens = [token for sentence in sentences for token in sentence]
+
+    loop_labels, loop_time = _timed(
+        lambda: [identify_language(word, eng_bigrams, maithili_bigrams) for word in tokens])
+    identify_languages(tokens[:10])
+    _, batch_time = _timed(identify_languages, tokens)
+    tagged, tag_time = _timed(tag_sentences, sentences)
+    tagged = [label for labels in tagged for label in labels]
+
+    def quality(labels):
+        accuracy = 100 * sum(label == true for label, true in zip(labels, truth)) / len(truth)
+        return f"{accuracy:.1f}% accurate, {100 * list(labels).count('Unknown') / len(labels):.1f}% Unknown"
+
+    print(f"identify_language loop : {len(tokens) / loop_time:12,.0f} tokens/sec ({quality(loop_labels)})")
+    print(f"identify_languages     : {len(tokens) / batch_time:12,.0f} tokens/sec")
+    print(f"tag_sentences (Viterbi): {len(tokens) / tag_time:12,.0f} tokens/sec ({quality(tagged)}, "
+          f"{loop_time / tag_time:.2f}x per-word loop, {batch_time / tag_time:.2f}x batch)")
+
+def _ngram_dict_size(paths):
+    """Memory (bytes) and entries of per-language dicts of 1-5-gram counts."""
+    tracemalloc.start()
+    tables = []
+    for path in paths:
+        table = {}
+        for word in open(path, encoding='utf-8').read().split():
+            padded = " " + word + " "
+            for n in range(1, 6):
+                for i in range(len(padded) - n + 1):
+                    ngram = padded[i:i + n]
+                    table[ngram] = table.get(ngram, 0) + 1
+        tables.append(table)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, sum(map(len, tables))
+
+def bench_hashed_language_id(n_words=500000, memory_mb=2, n_tokens=200000, seed=0):
+    """Compares the dict bigram model with the hashed 1-5-gram model: memory,
+    load time and tokens/sec, on synthetic corpora of n_words per language."""
+    with tempfile.TemporaryDirectory() as tmp:
+        eng_file, maithili_file = os.path.join(tmp, "eng.txt"), os.path.join(tmp, "maithili.txt")
+        with open(eng_file, 'w', encoding='utf-8') as file:
+            file.write(generate_english_text(n_words, seed))
+        with open(maithili_file, 'w', encoding='utf-8') as file:
+            file.write(generate_maithili_text(n_words, seed=seed + 1))
+
+        bigram_model = build_language_model(eng_file, maithili_file)
+        dict_bytes, dict_entries = _ngram_dict_size((eng_file, maithili_file))
+        hashed_model, hashed_build = _timed(build_hashed_model, eng_file, maithili_file, memory_mb)
+
+        bigram_path, hashed_path = os.path.join(tmp, "bigram.pkl"), os.path.join(tmp, "hashed.bin")
+        save_language_model(bigram_model, bigram_path)
+        hashed_model.save(hashed_path)
+        _, bigram_load = _timed(read_language_model, bigram_path)
+        hashed_model, hashed_load = _timed(HashedLanguageModel.load, hashed_path)
+
+        tokens = generate_code_mixed_text(n_tokens, seed + 2).split()
+        eng_bigrams, maithili_bigrams = bigram_model["eng"], bigram_model["maithili"]
+        identify_languages(tokens[:10], eng_bigrams, maithili_bigrams)
+        _, bigram_time = _timed(identify_languages, tokens, eng_bigrams, maithili_bigrams)
+        _, hashed_time = _timed(hashed_model.identify, tokens)
+        del hashed_model
+
+    print(f"bigram dict model      : load {bigram_load * 1e3:.1f} ms, {len(tokens) / bigram_time:,.0f} tokens/sec")
+    print(f"1-5-gram dicts         : {dict_bytes / 1e6:12.2f} MB ({dict_entries:,} n-grams)")
+    print(f"hashed 1-5-gram model  : {memory_mb:12.2f} MB cap, built in {hashed_build:.2f} s, "
+          f"load {hashed_load * 1e3:.1f} ms, {len(tokens) / hashed_time:,.0f} tokens/sec")
+
+def bench_pcm_cache(filename="MAI_M_ALEXA_00166.wav", repeats=5):
+    """Compares decoding audio with ffmpeg against PCM cache hits (needs Whisper and ffmpeg)."""
+    path = resolve_path(filename)
+    previous = stt.config["pcm_cache_dir"]
+    with tempfile.TemporaryDirectory() as tmp:
+        stt.configure(pcm_cache_dir=tmp)
+        try:
+            _, decode_time = _timed(stt.load_audio, path)
+            hit_time = min(_timed(stt.load_audio, path)[1] for _ in range(repeats))
+        except (ImportError, RuntimeError, OSError) as e:
+            print(f"pcm cache              : skipped ({e})")
+            return
+        finally:
+            stt.configure(pcm_cache_dir=previous)
+
+    print(f"ffmpeg decode          : {decode_time * 1e3:12.1f} ms")
+    print(f"pcm cache hit          : {hit_time * 1e3:12.1f} ms ({decode_time / hit_time:.0f}x)")
+
+def bench_region_ocr(scale=4.0, pages=3):
+    """Compares pages/sec of whole-page and region OCR on synthetic scans
+    (A4 at 150 * scale DPI). Without Tesseract, only the preprocessing and
+    the share of pixels each mode would send to it are reported."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "page.png")
+        cv2.imwrite(path, generate_page_image(scale))
+
+        gray, dpi = load_page_at_dpi(path)
+        regions = find_text_regions(binarize(gray))
+        region_pixels = sum(w * h for _, _, w, h in regions)
+        page_pixels = PAGE_SHAPE[0] * PAGE_SHAPE[1] * scale * scale
+        print(f"region detection       : {len(regions)} regions at {dpi:.0f} DPI, "
+              f"{100 * region_pixels / page_pixels:.1f}% of the full-page pixels")
+
+        try:
+            pytesseract.get_tesseract_version()
+        except (pytesseract.TesseractNotFoundError, OSError):
+            _, whole_time = _timed(preprocess_image, path)
+            _, region_time = _timed(lambda: binarize(load_page_at_dpi(path)[0]))
+            print(f"preprocess, whole page : {whole_time:12.2f} s/page (Tesseract not installed)")
+            print(f"preprocess, regions    : {region_time:12.2f} s/page")
+            return
+
+        _, whole_time = _timed(lambda: [ocr_page(path) for _ in range(pages)])
+        _, region_time = _timed(lambda: [ocr_page_regions(path) for _ in range(pages)])
+    print(f"whole-page OCR         : {pages / whole_time:12.2f} pages/sec")
+    print(f"region OCR             : {pages / region_time:12.2f} pages/sec ({whole_time / region_time:.2f}x)")
+
+class _StandInTranslator(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the translate endpoint: each line of q comes back as
+    EN(line). The first request gets a 429, and a multi-line batch
+    containing a "॥" comes back as one line, as the real service sometimes
+    does, so the client's retry and fallback paths both run.
+    """
+
+    requests = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        text = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode('utf-8'))["q"][0]
+        with self.lock:
+            self.requests.append(text)
+            first = len(self.requests) == 1
+        if first:
+            self.send_response(429)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        separator = " " if "॥" in text else "\n"
+        body = json.dumps([[[separator.join(f"EN({line})" for line in text.split("\n")), text]]]).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def bench_translate_client(n_sentences=5000, seed=0):
+    """Runs translate_document against a local stand-in server and checks
+    batching, the 429 retry, the collapsed-batch fallback and the cache."""
+    rng = random.Random(seed)
+    words = generate_maithili_text(8 * n_sentences, seed=seed).split()
+    sentences = [" ".join(words[i:i + 8]) + ("॥" if rng.random() < 0.002 else "।") for i in range(0, len(words), 8)]
+    text = " ".join(sentences)
+    expected = " ".join(f"EN({sentence})" for sentence in sentences)
+
+    batches = translate.pack_batches(sentences)
+    collapsed = [batch for batch in batches if len(batch) > 1 and any("॥" in sentences[i] for i in batch)]
+    expected_requests = 1 + len(batches) + sum(len(batch) for batch in collapsed)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInTranslator)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    _StandInTranslator.requests = []
+    previous_cache, previous_backend = translate.cache, translate.get_backend().name
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            translate.cache = translate.TranslationCache(os.path.join(tmp, "cache.sqlite3"))
+            translate.set_backend("google")
+            cold, cold_time = _timed(lambda: translate.translate_document(text, url=url, backoff=0.01))
+            cold_requests = len(_StandInTranslator.requests)
+            warm, warm_time = _timed(lambda: translate.translate_document(text, url=url))
+            warm_requests = len(_StandInTranslator.requests) - cold_requests
+
+            items = [(translate.TranslationCache.key(sentence, 'auto', 'en'), sentence) for sentence in sentences]
+            one_by_one = translate.TranslationCache(os.path.join(tmp, "put.sqlite3"))
+            _, put_time = _timed(lambda: [one_by_one.put(*item) for item in items[:500]])
+            _, put_many_time = _timed(translate.TranslationCache(os.path.join(tmp, "many.sqlite3")).put_many, items)
+    finally:
+        server.shutdown()
+        server.server_close()
+        translate.cache = previous_cache
+        translate.set_backend(previous_backend)
+
+    assert cold == expected, "Stand-in translations were not put back in order"
+    assert cold_requests == expected_requests, f"Expected {expected_requests} requests, sent {cold_requests}"
+    assert warm == expected and warm_requests == 0, "Second run was not answered from the cache"
+
+    print(f"translate, stand-in    : {len(sentences) / cold_time:12,.0f} sentences/sec "
+          f"({len(batches)} batches, {len(collapsed)} collapsed and retried per sentence, 1 retried 429)")
+    print(f"translate, cached      : {len(sentences) / warm_time:12,.0f} sentences/sec (0 requests)")
+    print(f"cache put / put_many   : {500 / put_time:12,.0f} / {len(items) / put_many_time:,.0f} entries/sec")
+
+def _repeat_to_size(text, size_bytes):
+    """Repeats text (joined by newlines) until it is at least size_bytes of UTF-8."""
+    line = text.strip() + "\n"
+    return line * (size_bytes // len(line.encode('utf-8')) + 1)
+
+def bench_transliteration(size_mb=10):
+    """Reports MB/sec of both transliteration directions on size_mb inputs."""
+    size_bytes = size_mb * 1024 * 1024
+    roman_text = _repeat_to_size(open(resolve_path("maithili_corpus.txt"), encoding='utf-8').read(), size_bytes)
+
+    devanagari_text, roman_time = _timed(roman_to_devanagari_transliterate, roman_text)
+    devanagari_text = _repeat_to_size(devanagari_text, size_bytes)
+    _, devanagari_time = _timed(devanagari_to_roman_transliterate, devanagari_text)
+
+    print(f"roman_to_devanagari    : {len(roman_text.encode('utf-8')) / roman_time / 1e6:12.2f} MB/sec")
+    print(f"devanagari_to_roman    : {len(devanagari_text.encode('utf-8')) / devanagari_time / 1e6:12.2f} MB/sec")
+
+def generate_lexicon(n_words, seed=0):
+    """Synthetic Devanagari lexicon of n_words distinct 2-5 syllable words with frequencies."""
+    rng = random.Random(seed)
+    roman = set()
+    while len(roman) < n_words:
+        roman.add("".join(rng.choice(_ONSETS) + rng.choice(_VOWELS) for _ in range(rng.randint(2, 5))))
+    words = roman_to_devanagari_transliterate(" ".join(sorted(roman))).split()
+    return {word: rng.randint(1, 1000) for word in words}
+
+def _misspell(word, rng, alphabet):
+    """Delete, substitute, insert or transpose one grapheme cluster of word."""
+    clusters = grapheme_clusters(word)
+    edit, i = rng.randrange(4), rng.randrange(len(clusters))
+    if edit == 0 and len(clusters) > 2:
+        del clusters[i]
+    elif edit == 1:
+        clusters[i] = rng.choice(alphabet)
+    elif edit == 2:
+        clusters.insert(i, rng.choice(alphabet))
+    elif i + 1 < len(clusters):
+        clusters[i], clusters[i + 1] = clusters[i + 1], clusters[i]
+    return "".join(clusters)
+
+def bench_spell_correction(n_words=50000, n_queries=5000, target=SPELL_LOOKUP_TARGET, seed=0):
+    """Reports spell-correction lookups/sec against target; one in five queries is spelled correctly."""
+    lexicon = generate_lexicon(n_words, seed)
+    index, build_time = _timed(SpellIndex.build, lexicon)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "spell_index.bin")
+        index.save(path)
+        index_bytes = os.path.getsize(path)
+        index, load_time = _timed(SpellIndex.load, path)
+
+    rng = random.Random(seed)
+    vocab = sorted(lexicon)
+    alphabet = sorted(index.alphabet)
+    queries = [word if rng.random() < 0.2 else _misspell(word, rng, alphabet)
+               for word in (rng.choice(vocab) for _ in range(n_queries))]
+    _, lookup_time = _timed(lambda: [index.lookup(query) for query in queries])
+    rate = n_queries / lookup_time
+
+    print(f"spell index build      : {build_time:12.2f} s ({n_words:,} words)")
+    print(f"spell index load       : {load_time:12.2f} s ({index_bytes / 1e6:.1f} MB)")
+    print(f"spell lookups          : {rate:12,.0f} lookups/sec "
+          f"({'meets' if rate >= target else 'BELOW'} target of {target:,})")
+    return rate >= target
+
+def bench_stemming(n_tokens=1000000, n_types=20000, seed=0):
+    """Compares stem_many tokens/sec, with a cold and a warm cache, against the
+    whitespace tokenization that feeds code_mixed.identify_languages."""
+    vocab = sorted(generate_lexicon(n_types, seed))
+    ranks = np.random.default_rng(seed).zipf(1.2, n_tokens * 2)
+    text = " ".join(vocab[rank - 1] for rank in ranks[ranks <= n_types][:n_tokens])
+
+    tokens, split_time = _timed(str.split, text)
+    stemmer = Stemmer()
+    _, cold_time = _timed(stemmer.stem_many, tokens)
+    _, warm_time = _timed(stemmer.stem_many, tokens)
+
+    print(f"tokenization (split)   : {len(tokens) / split_time:12,.0f} tokens/sec")
+    print(f"stem_many, cold cache  : {len(tokens) / cold_time:12,.0f} tokens/sec")
+    print(f"stem_many, warm cache  : {len(tokens) / warm_time:12,.0f} tokens/sec "
+          f"({split_time / warm_time:.2f}x tokenization)")
+
+def _corpus_words(filename):
+    return open(resolve_path(filename), encoding='utf-8').read().split()
+
+def generate_maithili_text(n_words, script="roman", seed=0):
+    """Synthetic Maithili: corpus words mixed with random syllable words."""
+    rng = random.Random(seed)
+    vocab = _corpus_words("maithili_corpus.txt")
+    words = []
+    for _ in range(n_words):
+        if rng.random() < 0.5:
+            words.append(rng.choice(vocab))
+        else:
+            words.append("".join(rng.choice(_ONSETS) + rng.choice(_VOWELS) for _ in range(rng.randint(1, 3))))
+    text = _wrap_lines(words, rng)
+    return roman_to_devanagari_transliterate(text) if script == "devanagari" else text
+
+def generate_english_text(n_words, seed=0):
+    """Synthetic English drawn from the English corpus vocabulary."""
+    rng = random.Random(seed)
+    vocab = _corpus_words("eng_corpus.txt")
+    return _wrap_lines([rng.choice(vocab) for _ in range(n_words)], rng)
+
+def generate_code_mixed_text(n_words, seed=0, with_labels=False):
+    """Synthetic code-mixed text: runs of English and Roman Maithili words.
+
+    With with_labels, returns (text, labels) where labels holds the true
+    language of each word, in order.
+    """
+    rng = random.Random(seed)
+    english = generate_english_text(n_words, seed).split()
+    maithili = generate_maithili_text(n_words, seed=seed + 1).split()
+    words, labels, use_english = [], [], False
+    for i in range(n_words):
+        if rng.random() < 0.3:
+            use_english = not use_english
+        words.append(english[i] if use_english else maithili[i])
+        labels.append("English" if use_english else "Maithili")
+    text = _wrap_lines(words, rng)
+    return (text, labels) if with_labels else text
+
+def generate_script_mixed_text(n_words, seed=0):
+    """Synthetic mixed-script text: runs of Devanagari Maithili and Roman English words."""
+    rng = random.Random(seed)
+    english = generate_english_text(n_words, seed).split()
+    maithili = generate_maithili_text(n_words, script="devanagari", seed=seed + 1).split()
+    words, use_english = [], False
+    for i in range(n_words):
+        if rng.random() < 0.3:
+            use_english = not use_english
+        words.append(english[i] if use_english else maithili[i])
+    return _wrap_lines(words, rng)
+
+def bench_script_segmentation(n_words=200000, seed=0):
+    """Compares mixed_transliterate with detect-then-convert, per text and per token."""
+    text = generate_script_mixed_text(n_words, seed)
+    tokens = text.split()
+
+    _, whole_time = _timed(text_transliterate, text, 'auto')
+    _, token_time = _timed(lambda: [text_transliterate(token, 'auto') for token in tokens])
+    _, mixed_time = _timed(mixed_transliterate, text)
+
+    print(f"detect+convert, text   : {n_words / whole_time:12,.0f} words/sec (one script for everything)")
+    print(f"detect+convert, token  : {n_words / token_time:12,.0f} words/sec")
+    print(f"mixed_transliterate    : {n_words / mixed_time:12,.0f} words/sec "
+          f"({token_time / mixed_time:.2f}x per-token, {whole_time / mixed_time:.2f}x whole-text)")
+
+def _wrap_lines(words, rng):
+    """Join words into lines of 5 to 15 words."""
+    lines, i = [], 0
+    while i < len(words):
+        n = rng.randint(5, 15)
+        lines.append(" ".join(words[i:i + n]))
+        i += n
+    return "\n".join(lines) + "\n"
+
+def generate_page_image(scale=1.0, seed=0):
+    """Synthetic scanned page: dark text-like strokes on a noisy light background."""
+    rng = np.random.default_rng(seed)
+    height, width = int(PAGE_SHAPE[0] * scale), int(PAGE_SHAPE[1] * scale)
+    page = rng.normal(225, 12, (height, width)).clip(0, 255).astype(np.uint8)
+    line_height = max(int(28 * scale), 4)
+    margin = int(80 * scale)
+    for top in range(margin, height - margin - line_height, int(line_height * 1.6)):
+        x = margin
+        while x < width - margin:
+            word = int(rng.integers(3, 12) * line_height * 0.45)
+            page[top:top + line_height, x:min(x + word, width - margin)] = rng.integers(10, 60)
+            x += word + line_height
+    return cv2.cvtColor(page, cv2.COLOR_GRAY2BGR)
+
+def measure(func, *args, min_seconds=0.5, max_runs=50):
+    """Time func(*args) repeatedly, then once more under tracemalloc for peak memory."""
+    runs, elapsed = 0, 0.0
+    while runs < max_runs and (elapsed < min_seconds or runs < 1):
+        _, seconds = _timed(func, *args)
+        elapsed += seconds
+        runs += 1
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"ops_per_sec": runs / elapsed, "seconds_per_op": elapsed / runs, "peak_bytes": peak}
+
+def run_suite(text_sizes=TEXT_SIZES, image_scales=IMAGE_SCALES):
+    """Run every scaling benchmark; returns {"name[size]": measurement}."""
+    load_language_model()  # Keep the one-off model build out of the timings
+    results = {}
+
+    for size in text_sizes:
+        roman = generate_maithili_text(size)
+        devanagari = generate_maithili_text(size, script="devanagari")
+        mixed = generate_code_mixed_text(size)
+        script_mixed = generate_script_mixed_text(size)
+        cases = {
+            "text_transliterate.roman": (text_transliterate, roman),
+            "text_transliterate.devanagari": (text_transliterate, devanagari),
+            "mixed_transliterate": (mixed_transliterate, script_mixed),
+            "detect_script": (detect_script, mixed),
+            "process_mixed_corpus": (process_mixed_corpus, mixed),
+        }
+        for name, (func, text) in cases.items():
+            result = measure(func, text)
+            result["items_per_sec"] = size * result["ops_per_sec"]
+            results[f"{name}[{size}]"] = result
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in image_scales:
+            path = os.path.join(tmp, f"page_{scale}.png")
+            cv2.imwrite(path, generate_page_image(scale))
+            results[f"ocr.preprocess_image[{scale}x]"] = measure(preprocess_image, path)
+            results[f"ocr.find_text_regions[{scale}x]"] = measure(find_text_regions, preprocess_image(path))
+
+    return results
+
+def save_baseline(results, path):
+    """Write results plus machine details as a JSON baseline."""
+    baseline = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(baseline, file, indent=2)
+
+def compare_baseline(results, path, tolerance=REGRESSION_TOLERANCE):
+    """Return (name, baseline ops/sec, current ops/sec) for every regression."""
+    with open(path, encoding='utf-8') as file:
+        baseline = json.load(file)["results"]
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result["ops_per_sec"] < baseline[name]["ops_per_sec"] * (1 - tolerance):
+            regressions.append((name, baseline[name]["ops_per_sec"], result["ops_per_sec"]))
+    return regressions
+
+def print_results(results):
+    print(f"{'benchmark':45} {'ops/sec':>12} {'items/sec':>14} {'peak MB':>10}")
+    for name, result in results.items():
+        items = f"{result['items_per_sec']:14,.0f}" if "items_per_sec" in result else f"{'':14}"
+        print(f"{name:45} {result['ops_per_sec']:12,.2f} {items} {result['peak_bytes'] / 1e6:10.2f}")
+
+def main(argv=None):
+    """Run the scaling suite, optionally saving or comparing a JSON baseline."""
+    parser = argparse.ArgumentParser(description="Benchmarks for the Maithili toolkit.")
+    parser.add_argument("--quick", action="store_true", help="Only the smallest sizes")
+    parser.add_argument("--save", metavar="PATH", help="Save results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Report regressions against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="Allowed relative ops/sec drop before a regression is reported")
+    parser.add_argument("--paths", action="store_true",
+                        help="Also compare the per-word, batch, hashed and sequence language ID, "
+                             "time 10 MB transliteration, "
+                             "compare script-run and detect-then-convert transliteration, check "
+                             "spell-correction lookups/sec against its target and compare "
+                             "stemming with tokenization, time PCM cache hits against ffmpeg and "
+                             "compare region OCR with whole-page OCR, and check the batched "
+                             "translation client against a local stand-in server")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        results = run_suite(TEXT_SIZES[:1], IMAGE_SCALES[:1])
+    else:
+        results = run_suite()
+    print_results(results)
+
+    if args.paths:
+        bench_identify_languages()
+        bench_hashed_language_id()
+        bench_sequence_tagging()
+        bench_transliteration()
+        bench_script_segmentation()
+        bench_spell_correction()
+        bench_stemming()
+        bench_pcm_cache()
+        bench_region_ocr()
+        bench_translate_client()
+    if args.save:
+        save_baseline(results, args.save)
+        print(f"Saved baseline to {args.save}")
+    if args.compare:
+        regressions = compare_baseline(results, args.compare, args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:,.2f} -> {after:,.2f} ops/sec")
+        if regressions:
+            return 1
+        print("No regressions")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,19 +1,120 @@
-from collections import defaultdict
+import hashlib
+import json
+import os
+import pickle
+import re
+import struct
+from collections import Counter, defaultdict
+from itertools import chain
+
+import numpy as np
+
+from metrics import instrument, payload_bytes, timer
+from parallel import ordered_map
+
+# Get the current script directory
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Source corpora and the compiled language-ID model built from them
+ENG_CORPUS = "eng_corpus.txt"
+MAITHILI_CORPUS = "maithili_corpus.txt"
+MODEL_PATH = os.path.join(script_dir, "corpus", "langid_model.pkl")
+MODEL_VERSION = 1
+
+# Characters read per corpus shard when streaming a corpus
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Compiled model, loaded lazily once per process
+_model = None
+
+# Labels returned by the batch API, indexed by the codes it computes
+LANGUAGE_LABELS = np.array(["English", "Maithili", "Unknown"])
+
+# Hashed n-gram model: memory for the count tables is capped by configuration
+# and does not grow with the vocabulary; the file is memory-mapped on load
+HASHED_MODEL_PATH = os.path.join(script_dir, "corpus", "langid_hashed.bin")
+HASHED_MODEL_MAGIC = b"MLH1"
+HASHED_MODEL_VERSION = 1
+HASHED_MEMORY_MB = float(os.environ.get("MAITHILI_LANGID_MEMORY_MB", "8"))
+SKETCH_DEPTH = int(os.environ.get("MAITHILI_LANGID_SKETCH_DEPTH", "2"))
+NGRAM_ORDERS = (1, 2, 3, 4, 5)
+SMOOTHING = 0.5
+
+# Model behind process_mixed_corpus: "bigram" (default) or "hashed"
+LANGID_BACKEND = os.environ.get("MAITHILI_LANGID_BACKEND", "bigram")
+
+# Sentence tagger: cost (in log-probability) of switching language between
+# adjacent tokens, add-k smoothing of the bigram scores, and sentences
+# decoded per Viterbi batch
+SWITCH_PENALTY = 0.5
+TAGGER_SMOOTHING = 1.0
+TAGGER_BATCH = 1024
+
+# Sentences end at line breaks and after sentence punctuation
+_sentence_break = re.compile(r'(?<=[.!?।॥])\s+|\n+')
+
+# Characters hashed per chunk when building the hashed model
+HASHED_CHUNK_SIZE = 1024 * 1024
+
+# Multipliers for the polynomial n-gram hash and the per-row sketch hashes
+_NGRAM_PRIME = np.uint64(0x100000001B3)
+_ROW_MULTIPLIERS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9,
+                    0xD6E8FEB86659FD93, 0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53)
+
+# Function to split a corpus file into shards without cutting words
+def iter_corpus_chunks(filename, chunk_size=CHUNK_SIZE):
+    """Yields successive pieces of a text file, each ending on a word boundary.
+
+    At most one chunk plus the trailing partial word is held in memory; the
+    partial word is carried over and prepended to the next chunk.
+    """
+    carry = ""
+    with open(filename, 'r', encoding='utf-8') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            j = len(chunk)
+            while j and not chunk[j - 1].isspace():
+                j -= 1
+            if j == 0:
+                carry += chunk
+                continue
+            yield carry + chunk[:j]
+            carry = chunk[j:]
+    if carry:
+        yield carry
+
+def count_bigrams(text):
+    """Counts the bigrams of every whitespace-separated word in text."""
+    return Counter(word[i:i+2] for word in text.split() for i in range(len(word) - 1))
+
+def _merge_counts(bigram_map, counts):
+    """Adds a shard's bigram counts into the running totals."""
+    for bigram, count in counts.items():
+        bigram_map[bigram] += count
 
 # Function to build bigram frequency from a text file
-def build_bigram_freq(filename):
-    """Builds a dictionary of bigram frequencies from the given file."""
+def build_bigram_freq(filename, chunk_size=CHUNK_SIZE, workers=1):
+    """Builds a dictionary of bigram frequencies from the given file.
+
+    The file is streamed in chunks of chunk_size characters. With workers > 1
+    the chunks are counted in a process pool, keeping at most two chunks per
+    worker in flight, and the partial counts are merged as they come back.
+    If the file can't be read to the end, an empty map is returned rather
+    than the counts of the part read, so a truncated model is never saved.
+    """
     bigram_map = defaultdict(int)
     try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            for word in file.read().split():
-                for i in range(len(word) - 1):
-                    bigram = word[i:i+2]
-                    bigram_map[bigram] += 1
+        chunks = ((chunk,) for chunk in iter_corpus_chunks(filename, chunk_size))
+        for counts in ordered_map(count_bigrams, chunks, workers):
+            _merge_counts(bigram_map, counts)
     except FileNotFoundError:
         print(f"Error: File '{filename}' not found.")
+        return defaultdict(int)
     except Exception as e:
         print(f"Error reading file '{filename}': {e}")
+        return defaultdict(int)
     return bigram_map
 
 # Function to identify language using bigram score
@@ -36,18 +137,510 @@ def identify_language(word, eng_bigrams, maithili_bigrams):
     else:
         return "Unknown"
 
+# Function to map bigrams to integer ids for vectorized scoring
+def compile_bigram_index(eng_bigrams, maithili_bigrams):
+    """Builds a bigram -> id map and a (vocab + 1, 2) score table.
+
+    Id 0 is reserved for bigrams seen in neither corpus and scores zero.
+    """
+    index = {}
+    for bigram in eng_bigrams.keys() | maithili_bigrams.keys():
+        index[bigram] = len(index) + 1
+
+    scores = np.zeros((len(index) + 1, 2), dtype=np.int64)
+    for bigram, idx in index.items():
+        scores[idx, 0] = eng_bigrams.get(bigram, 0)
+        scores[idx, 1] = maithili_bigrams.get(bigram, 0)
+    return index, scores
+
+def _model_index(model):
+    """Returns the bigram index of a loaded model, compiling it on first use."""
+    if "index" not in model:
+        model["index"] = compile_bigram_index(model["eng"], model["maithili"])
+    return model["index"]
+
+# Function to identify the language of many words at once
+@instrument("code_mixed.identify_languages")
+def identify_languages(tokens, eng_bigrams=None, maithili_bigrams=None):
+    """Identify the language of each token; same labels as identify_language.
+
+    Tokens are first collapsed to distinct types. The bigrams of all types
+    are mapped to ids in one flat pass, their scores gathered from the table
+    and summed per type with a bincount, and the labels are scattered back
+    to the token positions. When no bigram tables are given the cached
+    language model is used.
+    """
+    if eng_bigrams is None or maithili_bigrams is None:
+        index, scores = _model_index(load_language_model())
+    else:
+        index, scores = compile_bigram_index(eng_bigrams, maithili_bigrams)
+
+    types = {}
+    inverse = np.array([types.setdefault(word, len(types)) for word in tokens], dtype=np.int64)
+    if not types:
+        return LANGUAGE_LABELS[:0]
+
+    eng_score, maithili_score = _bigram_scores(list(types), index, scores)
+    codes = np.where(eng_score > maithili_score, 0, np.where(maithili_score > eng_score, 1, 2))
+    return LANGUAGE_LABELS[codes[inverse]]
+
+def _bigram_scores(words, index, scores):
+    """Summed English and Maithili bigram scores of each word, as two arrays."""
+    lookup = index.get
+    ids = np.array([lookup(word[i:i+2], 0) for word in words for i in range(len(word) - 1)], dtype=np.int64)
+    lengths = np.array([max(len(word) - 1, 0) for word in words], dtype=np.int64)
+    segments = np.repeat(np.arange(len(words)), lengths)
+
+    gathered = scores[ids]
+    eng_score = np.bincount(segments, weights=gathered[:, 0], minlength=len(words))
+    maithili_score = np.bincount(segments, weights=gathered[:, 1], minlength=len(words))
+    return eng_score, maithili_score
+
+def resolve_path(filename):
+    """Resolve a relative corpus filename against the script directory."""
+    return filename if os.path.isabs(filename) else os.path.join(script_dir, filename)
+
+def _file_stat(path):
+    """Returns the (mtime, size) pair used as a cheap change check."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+def _file_hash(path):
+    """Returns the SHA-1 of a file, read in blocks."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _sources_fresh(sources, check_hash=True):
+    """Checks whether recorded corpus signatures still match the files on disk.
+
+    A file whose mtime or size moved is only considered changed if its
+    content hash differs too, so touching a corpus does not force a rebuild.
+    Returns a (fresh, touched) pair; touched means signatures were refreshed.
+    """
+    touched = False
+    for path, meta in sources.items():
+        try:
+            if _file_stat(path) == (meta["mtime"], meta["size"]):
+                continue
+            if not check_hash or _file_hash(path) != meta["sha1"]:
+                return False, touched
+            meta["mtime"], meta["size"] = _file_stat(path)
+            touched = True
+        except OSError:
+            return False, touched
+    return True, touched
+
+@instrument("code_mixed.build_model")
+def build_language_model(eng_file=ENG_CORPUS, maithili_file=MAITHILI_CORPUS, workers=1):
+    """Builds the bigram tables for both languages plus the corpus signatures."""
+    sources = {}
+    for filename in (eng_file, maithili_file):
+        path = resolve_path(filename)
+        try:
+            mtime, size = _file_stat(path)
+            sources[path] = {"mtime": mtime, "size": size, "sha1": _file_hash(path)}
+        except OSError:
+            pass
+
+    return {
+        "version": MODEL_VERSION,
+        "sources": sources,
+        "eng": dict(build_bigram_freq(resolve_path(eng_file), workers=workers)),
+        "maithili": dict(build_bigram_freq(resolve_path(maithili_file), workers=workers)),
+    }
+
+def save_language_model(model, model_path=MODEL_PATH):
+    """Serializes a compiled model to a binary pickle file."""
+    tmp_path = model_path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(model, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, model_path)
+    except OSError as e:
+        print(f"Error writing model file '{model_path}': {e}")
+
+def read_language_model(model_path):
+    """Reads a compiled model from disk, or returns None if unusable."""
+    try:
+        with open(model_path, 'rb') as file:
+            model = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    if not isinstance(model, dict) or model.get("version") != MODEL_VERSION:
+        return None
+    return model
+
+def load_language_model(eng_file=ENG_CORPUS, maithili_file=MAITHILI_CORPUS, model_path=MODEL_PATH, workers=1):
+    """Returns the compiled language-ID model, rebuilding it only when stale.
+
+    The model is kept in memory after the first call. On disk it is reused
+    as long as both source corpora are unchanged; otherwise it is rebuilt
+    from the corpora, using workers processes per corpus, and written back.
+    """
+    global _model
+    expected = {resolve_path(eng_file), resolve_path(maithili_file)}
+
+    if _model is not None and set(_model["sources"]) == expected:
+        if _sources_fresh(_model["sources"], check_hash=False)[0]:
+            return _model
+
+    # Only a real read or rebuild is timed, not the in-memory hit above
+    with timer("code_mixed.load_model"):
+        model = read_language_model(model_path)
+        fresh, touched = (False, False)
+        if model is not None and set(model["sources"]) == expected:
+            fresh, touched = _sources_fresh(model["sources"])
+
+        if not fresh:
+            model = build_language_model(eng_file, maithili_file, workers=workers)
+            if model["eng"] and model["maithili"]:
+                save_language_model(model, model_path)
+        elif touched:
+            # Only the mtimes moved; record them so the hash is not recomputed next time
+            save_language_model(model, model_path)
+
+    _model = model
+    return _model
+
+# Hashed n-gram language ID
+def hash_ngrams(words, orders=NGRAM_ORDERS, depth=SKETCH_DEPTH, width_bits=20):
+    """Hashes the character n-grams of words into sketch columns.
+
+    Each word is padded with a space on both sides, so n-grams at word
+    edges are distinct from those inside it; n-grams never span words.
+    The separating spaces are located from the word lengths rather than
+    the text, so a word may itself contain whitespace.
+    Returns (columns, word_ids, order_ids): a (depth, m) array of column
+    indexes, one per sketch row, and for each of the m n-grams the index of
+    its word and of its order in orders.
+    """
+    if not len(words):
+        return np.zeros((depth, 0), dtype=np.uint64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    text = " " + " ".join(words) + " "
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype='<u4').astype(np.uint64)
+    lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+    is_space = np.zeros(len(codes), dtype=bool)
+    is_space[np.concatenate(([0], np.cumsum(lengths + 1)))] = True
+    spaces = np.concatenate(([0], np.cumsum(is_space)))
+    word_of = spaces[1:] - 1  # Word each non-space position belongs to
+
+    columns, word_ids, order_ids = [], [], []
+    shift = np.uint64(64 - width_bits)
+    for order_id, n in enumerate(orders):
+        count = len(codes) - n + 1
+        if count <= 0:
+            continue
+        h = np.zeros(count, dtype=np.uint64)
+        for k in range(n):
+            h = h * _NGRAM_PRIME + codes[k:k + count]
+        h ^= np.uint64(n)
+        starts = np.arange(count)
+        # Valid n-grams have no space inside; only their ends may be padding
+        inner = spaces[starts + n] - spaces[starts] - is_space[starts] - is_space[starts + n - 1]
+        valid = (inner == 0) & ~(is_space[starts] & (n == 1))
+        if n > 1:
+            valid &= ~(is_space[starts] & is_space[starts + n - 1])
+        h, starts = h[valid], starts[valid]
+        columns.append(np.stack([(h * np.uint64(_ROW_MULTIPLIERS[d])) >> shift for d in range(depth)]))
+        word_ids.append(word_of[starts + is_space[starts]])
+        order_ids.append(np.full(len(h), order_id))
+
+    if not columns:
+        return np.zeros((depth, 0), dtype=np.uint64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(columns, axis=1), np.concatenate(word_ids), np.concatenate(order_ids)
+
+# Largest value a sketch counter holds
+_COUNT_MAX = np.iinfo(np.uint32).max
+
+class HashedLanguageModel:
+    """
+    Character 1-5-gram language ID backed by count-min sketches.
+
+    counts has shape (languages, depth, width): for every language, depth
+    rows of width uint32 counters, each n-gram hashed to one counter per
+    row. Its estimated count is the minimum over the rows (with depth 1
+    this is a plain hashed count table). Words are scored by the sum of
+    their smoothed n-gram log-probabilities under each language.
+    """
+
+    languages = ("English", "Maithili")
+
+    def __init__(self, counts, totals, orders=NGRAM_ORDERS, sources=None):
+        self.counts = counts
+        self.totals = np.asarray(totals, dtype=np.float64)
+        self.orders = tuple(orders)
+        self.sources = sources or {}
+        self.depth, self.width = counts.shape[1], counts.shape[2]
+        self.width_bits = self.width.bit_length() - 1
+
+    @classmethod
+    def sketch_width(cls, memory_mb=HASHED_MEMORY_MB, depth=SKETCH_DEPTH):
+        """Largest power-of-two row width whose tables fit in memory_mb megabytes."""
+        cells = int(memory_mb * 1024 * 1024) // (4 * len(cls.languages) * depth)
+        if cells < 1:
+            raise ValueError(f"memory_mb={memory_mb} is too small for a depth-{depth} sketch")
+        return 1 << (cells.bit_length() - 1)
+
+    @classmethod
+    def empty(cls, memory_mb=HASHED_MEMORY_MB, depth=SKETCH_DEPTH, orders=NGRAM_ORDERS):
+        """A model with no counts whose tables use at most memory_mb megabytes."""
+        width = cls.sketch_width(memory_mb, depth)
+        counts = np.zeros((len(cls.languages), depth, width), dtype=np.uint32)
+        return cls(counts, np.zeros((len(cls.languages), len(orders))), orders)
+
+    @property
+    def nbytes(self):
+        return self.counts.nbytes
+
+    def add_text(self, language, text):
+        """Counts the n-grams of every word in text for language (0 English, 1 Maithili).
+
+        Counters saturate at the uint32 maximum instead of wrapping around.
+        """
+        columns, _, order_ids = hash_ngrams(text.split(), self.orders, self.depth, self.width_bits)
+        for row in range(self.depth):
+            total = self.counts[language, row] + np.bincount(columns[row], minlength=self.width).astype(np.uint64)
+            self.counts[language, row] = np.minimum(total, _COUNT_MAX)
+        self.totals[language] += np.bincount(order_ids, minlength=len(self.orders))
+
+    def scores(self, words):
+        """Returns an (n_words, 2) array of log-probabilities and a boolean
+        array marking words with at least one n-gram seen in training."""
+        columns, word_ids, order_ids = hash_ngrams(words, self.orders, self.depth, self.width_bits)
+        scores = np.zeros((len(words), len(self.languages)))
+        evidence = np.zeros(len(words), dtype=bool)
+        if not len(word_ids):
+            return scores, evidence
+
+        rows = np.arange(self.depth)[:, None]
+        for language in range(len(self.languages)):
+            counts = self.counts[language][rows, columns].min(axis=0).astype(np.float64)
+            denominators = self.totals[language] + SMOOTHING * self.width
+            log_probs = np.log(counts + SMOOTHING) - np.log(denominators)[order_ids]
+            scores[:, language] = np.bincount(word_ids, weights=log_probs, minlength=len(words))
+            evidence |= np.bincount(word_ids, weights=counts, minlength=len(words)) > 0
+        return scores, evidence
+
+    def identify(self, tokens):
+        """Labels tokens like identify_languages, from the hashed n-gram scores."""
+        types = {}
+        inverse = np.array([types.setdefault(word, len(types)) for word in tokens], dtype=np.int64)
+        if not types:
+            return LANGUAGE_LABELS[:0]
+        scores, evidence = self.scores(list(types))
+        codes = np.where(scores[:, 0] > scores[:, 1], 0, np.where(scores[:, 1] > scores[:, 0], 1, 2))
+        codes[~evidence] = 2
+        return LANGUAGE_LABELS[codes[inverse]]
+
+    def save(self, path=HASHED_MODEL_PATH):
+        """Writes the model as magic, a length-prefixed JSON header padded to
+        16 bytes, then the raw little-endian uint32 counts."""
+        header = json.dumps({
+            "version": HASHED_MODEL_VERSION,
+            "shape": list(self.counts.shape),
+            "orders": list(self.orders),
+            "totals": self.totals.tolist(),
+            "sources": self.sources,
+        }).encode('utf-8')
+        prefix = len(HASHED_MODEL_MAGIC) + 4
+        header += b" " * (-(prefix + len(header)) % 16)
+        tmp_path = path + ".tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as file:
+            file.write(HASHED_MODEL_MAGIC + struct.pack('<I', len(header)) + header)
+            file.write(np.ascontiguousarray(self.counts, dtype='<u4').tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=HASHED_MODEL_PATH):
+        """Memory-maps a model written by save(), or returns None if unusable."""
+        try:
+            with open(path, 'rb') as file:
+                if file.read(len(HASHED_MODEL_MAGIC)) != HASHED_MODEL_MAGIC:
+                    return None
+                (length,) = struct.unpack('<I', file.read(4))
+                header = json.loads(file.read(length))
+            if header.get("version") != HASHED_MODEL_VERSION:
+                return None
+            counts = np.memmap(path, dtype='<u4', mode='r', offset=len(HASHED_MODEL_MAGIC) + 4 + length,
+                               shape=tuple(header["shape"]))
+        except (OSError, ValueError, struct.error):
+            return None
+        return cls(counts, header["totals"], header["orders"], header["sources"])
+
+@instrument("code_mixed.build_hashed_model")
+def build_hashed_model(eng_file=ENG_CORPUS, maithili_file=MAITHILI_CORPUS, memory_mb=HASHED_MEMORY_MB,
+                       depth=SKETCH_DEPTH, orders=NGRAM_ORDERS):
+    """Streams both corpora into a new HashedLanguageModel."""
+    model = HashedLanguageModel.empty(memory_mb, depth, orders)
+    for language, filename in enumerate((eng_file, maithili_file)):
+        path = resolve_path(filename)
+        try:
+            mtime, size = _file_stat(path)
+            model.sources[path] = {"mtime": mtime, "size": size, "sha1": _file_hash(path)}
+            for chunk in iter_corpus_chunks(path, HASHED_CHUNK_SIZE):
+                model.add_text(language, chunk)
+        except FileNotFoundError:
+            print(f"Error: File '{filename}' not found.")
+    return model
+
+# Hashed model, memory-mapped lazily once per process
+_hashed_model = None
+
+def load_hashed_model(eng_file=ENG_CORPUS, maithili_file=MAITHILI_CORPUS, model_path=HASHED_MODEL_PATH,
+                      memory_mb=HASHED_MEMORY_MB, depth=SKETCH_DEPTH):
+    """Returns the hashed model, memory-mapping the saved file unless the
+    corpora or the memory and depth settings changed since it was built."""
+    global _hashed_model
+    expected = {resolve_path(eng_file), resolve_path(maithili_file)}
+    width = HashedLanguageModel.sketch_width(memory_mb, depth) if memory_mb else None
+
+    def matches(model):
+        return (model is not None and set(model.sources) == expected
+                and model.depth == depth and model.width == width)
+
+    if matches(_hashed_model) and _sources_fresh(_hashed_model.sources, check_hash=False)[0]:
+        return _hashed_model
+
+    # As in load_language_model, only a real load or rebuild is timed
+    with timer("code_mixed.load_hashed_model"):
+        model = HashedLanguageModel.load(model_path)
+        fresh, touched = (False, False)
+        if matches(model):
+            fresh, touched = _sources_fresh(model.sources)
+
+        if not fresh:
+            model = build_hashed_model(eng_file, maithili_file, memory_mb, depth)
+            if model.totals.all():
+                model.save(model_path)
+        elif touched:
+            # Only the mtimes moved; rewrite the header so the hash is not recomputed next time
+            model = HashedLanguageModel(np.array(model.counts), model.totals, model.orders, model.sources)
+            model.save(model_path)
+
+    _hashed_model = model
+    return _hashed_model
+
+@instrument("code_mixed.identify_languages_hashed")
+def identify_languages_hashed(tokens):
+    """Labels tokens with the hashed 1-5-gram model.
+
+    A different model from identify_languages, so labels can differ, but
+    drawn from the same LANGUAGE_LABELS set.
+    """
+    return load_hashed_model().identify(tokens)
+
+# Sentence-level code-mix tagging
+def token_log_posteriors(tokens):
+    """Per-token log P(English) and log P(Maithili), normalized over the two,
+    from the configured language-ID backend.
+
+    Returns an (n, 2) array and a boolean array marking tokens with any
+    n-gram seen in either corpus. Bigram scores are add-k smoothed counts,
+    so a token scoring zero in both languages gets equal posteriors.
+    """
+    types = {}
+    inverse = np.array([types.setdefault(word, len(types)) for word in tokens], dtype=np.int64)
+    words = list(types)
+    if LANGID_BACKEND == "hashed":
+        log_probs, evidence = load_hashed_model().scores(words)
+    else:
+        eng_score, maithili_score = _bigram_scores(words, *_model_index(load_language_model()))
+        counts = np.stack([eng_score, maithili_score], axis=1).reshape(-1, 2)
+        log_probs = np.log(counts + TAGGER_SMOOTHING)
+        evidence = counts.sum(axis=1) > 0
+    log_posteriors = log_probs - np.logaddexp(log_probs[:, :1], log_probs[:, 1:])
+    return log_posteriors[inverse], evidence[inverse]
+
+def viterbi_batch(emissions, lengths, switch_penalty=SWITCH_PENALTY):
+    """Best two-language label sequence for each of a batch of sentences.
+
+    emissions is a (sentences, max_length, 2) array of log-scores, padded
+    past each sentence's length; lengths gives those lengths. Every step
+    is computed for the whole batch at once. Returns a (sentences,
+    max_length) array of 0 (English) / 1 (Maithili) codes.
+    """
+    count, max_length, states = emissions.shape
+    transitions = np.array([[0.0, -switch_penalty], [-switch_penalty, 0.0]])
+    stay = np.arange(states)
+    delta = emissions[:, 0].copy()
+    backpointers = np.zeros((count, max_length, states), dtype=np.int8)
+
+    for t in range(1, max_length):
+        candidates = delta[:, :, None] + transitions  # (sentence, from, to)
+        best = candidates.argmax(axis=1)
+        scores = np.take_along_axis(candidates, best[:, None, :], axis=1)[:, 0] + emissions[:, t]
+        # Padding steps keep the previous scores and point back to the same state
+        active = (t < lengths)[:, None]
+        delta = np.where(active, scores, delta)
+        backpointers[:, t] = np.where(active, best, stay)
+
+    paths = np.zeros((count, max_length), dtype=np.int8)
+    state = delta.argmax(axis=1)
+    rows = np.arange(count)
+    for t in range(max_length - 1, -1, -1):
+        paths[:, t] = state
+        state = backpointers[rows, t, state]
+    return paths
+
+@instrument("code_mixed.tag_sentences")
+def tag_sentences(sentences, switch_penalty=SWITCH_PENALTY):
+    """Labels every token of every sentence (a list of token lists) using
+    per-token scores plus a penalty for each language switch.
+
+    All tokens are scored in one call, then sentences are sorted by length
+    and decoded TAGGER_BATCH at a time so padding stays small. Sentences
+    with no evidence for either language are labelled Unknown throughout.
+    """
+    lengths = np.array([len(sentence) for sentence in sentences], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    log_posteriors, evidence = token_log_posteriors(list(chain.from_iterable(sentences)))
+    codes = np.full(offsets[-1], 2, dtype=np.int64)
+
+    order = np.argsort(lengths, kind='stable')
+    order = order[lengths[order] > 0]
+    for start in range(0, len(order), TAGGER_BATCH):
+        batch = order[start:start + TAGGER_BATCH]
+        batch_lengths = lengths[batch]
+        rows = np.repeat(np.arange(len(batch)), batch_lengths)
+        columns = np.arange(batch_lengths.sum()) - np.repeat(np.cumsum(batch_lengths) - batch_lengths, batch_lengths)
+        positions = np.repeat(offsets[batch], batch_lengths) + columns
+
+        emissions = np.zeros((len(batch), batch_lengths.max(), 2))
+        emissions[rows, columns] = log_posteriors[positions]
+        paths = viterbi_batch(emissions, batch_lengths, switch_penalty)
+
+        has_evidence = np.bincount(rows, weights=evidence[positions], minlength=len(batch)) > 0
+        codes[positions] = np.where(has_evidence[rows], paths[rows, columns], 2)
+
+    labels = LANGUAGE_LABELS[codes].tolist()
+    bounds = offsets.tolist()
+    return [labels[start:end] for start, end in zip(bounds, bounds[1:])]
+
+@instrument("code_mixed.process_mixed_sentences", size=lambda input_text: payload_bytes(input_text))
+def process_mixed_sentences(input_text):
+    """Like process_mixed_corpus, but tags each sentence as a sequence, so
+    neighbouring words settle ties and isolated misreadings."""
+    sentences = [sentence.split() for sentence in _sentence_break.split(input_text)]
+    sentences = [sentence for sentence in sentences if sentence]
+    tagged = tag_sentences(sentences)
+    return [f"{word}: {lang}" for sentence, labels in zip(sentences, tagged) for word, lang in zip(sentence, labels)]
+
 # ✅ Function for UI to directly call with input_text
+@instrument("code_mixed.process_mixed_corpus", size=lambda input_text: payload_bytes(input_text))
 def process_mixed_corpus(input_text):
     """Takes a string and classifies each word as English or Maithili."""
-    eng_bigrams = build_bigram_freq("eng_corpus.txt")
-    maithili_bigrams = build_bigram_freq("maithili_corpus.txt")
-
-    if not eng_bigrams or not maithili_bigrams:
-        return ["Error: Could not load one or both corpus files."]
-
-    results = []
-    for word in input_text.split():
-        lang = identify_language(word, eng_bigrams, maithili_bigrams)
-        results.append(f"{word}: {lang}")
+    words = input_text.split()
+    if LANGID_BACKEND == "hashed":
+        labels = identify_languages_hashed(words)
+    else:
+        model = load_language_model()
+        if not model["eng"] or not model["maithili"]:
+            return ["Error: Could not load one or both corpus files."]
+        labels = identify_languages(words)
 
-    return results
+    return [f"{word}: {lang}" for word, lang in zip(words, labels)]
@@ -0,0 +1,125 @@
+# metrics.py
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def payload_bytes(value):
+    """Size of a text or binary payload in bytes; 0 for anything else."""
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return getattr(value, 'nbytes', 0)
+
+class MetricsRegistry:
+    """
+    Process-wide per-stage counters: call count, errors, bytes processed
+    and a cumulative latency histogram. Cheap enough to leave on.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, nbytes=0, error=False):
+        """Add one observation for stage."""
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = {
+                    "count": 0, "errors": 0, "seconds": 0.0, "bytes": 0,
+                    "buckets": [0] * (len(self.buckets) + 1),
+                }
+            entry["count"] += 1
+            entry["errors"] += int(error)
+            entry["seconds"] += seconds
+            entry["bytes"] += nbytes
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+                    break
+            else:
+                entry["buckets"][-1] += 1
+
+    @contextmanager
+    def timer(self, stage, nbytes=0):
+        """Time the enclosed block as one observation of stage."""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, nbytes, error)
+
+    def snapshot(self):
+        """Copy of every stage's counters, with cumulative histogram buckets."""
+        with self._lock:
+            stages = {stage: dict(entry, buckets=list(entry["buckets"])) for stage, entry in self._stages.items()}
+        for entry in stages.values():
+            cumulative, total = {}, 0
+            for bound, count in zip(self.buckets + (float("inf"),), entry["buckets"]):
+                total += count
+                cumulative["+Inf" if bound == float("inf") else repr(bound)] = total
+            entry["buckets"] = cumulative
+            entry["mean_seconds"] = entry["seconds"] / entry["count"] if entry["count"] else 0.0
+        return stages
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format."""
+        lines = [
+            "# HELP maithili_stage_seconds Stage latency in seconds.",
+            "# TYPE maithili_stage_seconds histogram",
+        ]
+        snapshot = self.snapshot()
+        for stage, entry in sorted(snapshot.items()):
+            for bound, count in entry["buckets"].items():
+                lines.append(f'maithili_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'maithili_stage_seconds_sum{{stage="{stage}"}} {entry["seconds"]}')
+            lines.append(f'maithili_stage_seconds_count{{stage="{stage}"}} {entry["count"]}')
+        for name, key, help_text in (("maithili_stage_errors_total", "errors", "Stage calls that raised."),
+                                     ("maithili_stage_bytes_total", "bytes", "Bytes processed by the stage.")):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for stage, entry in sorted(snapshot.items()):
+                lines.append(f'{name}{{stage="{stage}"}} {entry[key]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+# Shared by every module in the process
+registry = MetricsRegistry()
+record = registry.record
+timer = registry.timer
+
+def instrument(stage, size=None):
+    """Decorator timing every call of a function as stage.
+
+    size, if given, is called with the function's arguments and returns
+    the number of bytes the call processes.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            nbytes = size(*args, **kwargs) if size is not None else 0
+            with registry.timer(stage, nbytes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def format_breakdown(timings):
+    """One-line stage timing summary for status bars, e.g. 'raw 1.20s · translate 0.31s'."""
+    return " · ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
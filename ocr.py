@@ -1,18 +1,61 @@
+import argparse
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 from PIL import Image
 import pytesseract
+from metrics import record, timer
+from parallel import ordered_map
+
+# Image types picked up when a directory is given to the batch mode
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
 
 # Get the current script directory
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
-def preprocess_image(image_filename):
+# Region mode: pages above TARGET_DPI are downscaled to it first. Pages
+# without DPI metadata are assumed to be A4 (11.69 in on the long side)
+TARGET_DPI = 300
+A4_LONG_SIDE_INCHES = 11.69
+
+# Region mode: Tesseract calls run concurrently per page (each is its own
+# process, so threads are enough); regions denser than PICTURE_DENSITY
+# and taller than four lines of text are treated as pictures and skipped
+REGION_WORKERS = 4
+PICTURE_DENSITY = 0.5
+
+# Region mode: taller text blocks are cut at blank rows into pieces of
+# about this many lines, so a single-column page still OCRs in parallel
+REGION_MAX_LINES = 12
+
+def binarize(gray):
+    """Otsu binarization plus noise removal of a grayscale page."""
+    # Binarization using Otsu's threshold
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    # Noise removal
+    kernel = np.ones((1, 1), np.uint8)
+    return cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
+
+def clean_text(text):
+    """Strip Tesseract output and drop empty lines."""
+    return '\n'.join([line.strip() for line in text.strip().split('\n') if line.strip()])
+
+def preprocess_image(image_filename, save_debug=False):
+    """Returns the binarized page as a NumPy array, or None if it can't be read.
+
+    With save_debug the array is also written to <image>_processed.png
+    next to the input for inspection.
+    """
     # Full path to the image
     image_path = image_filename if os.path.isabs(image_filename) else os.path.join(script_dir, image_filename)
 
     
     # Read image
+    start = time.perf_counter()
     image = cv2.imread(image_path)
 
     if image is None:
@@ -21,31 +64,358 @@ def preprocess_image(image_filename):
 
     # Convert to grayscale
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    cleaned = binarize(gray)
+    record("ocr.preprocess", time.perf_counter() - start, image.nbytes)
 
-    # Binarization using Otsu's threshold
-    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-    # Noise removal
-    kernel = np.ones((1, 1), np.uint8)
-    cleaned = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
-
-    # Save preprocessed image
-    processed_path = os.path.join(script_dir, image_filename.replace('.png', '_processed.png'))
-    cv2.imwrite(processed_path, cleaned)
+    # Optionally save preprocessed image (never over the original)
+    if save_debug:
+        processed_path = os.path.splitext(image_path)[0] + '_processed.png'
+        cv2.imwrite(processed_path, cleaned)
     
-    return processed_path
+    return cleaned
 
-def extract_text_from_image(image_filename):
-    processed_path = preprocess_image(image_filename)
+def extract_text_from_image(image_filename, save_debug=False):
+    processed = preprocess_image(image_filename, save_debug)
 
-    if processed_path is None:
+    if processed is None:
         return
 
-    # OCR
-    text = pytesseract.image_to_string(Image.open(processed_path), lang='hin')
+    # OCR straight from the in-memory array
+    with timer("ocr.tesseract", processed.nbytes):
+        text = pytesseract.image_to_string(processed, lang='hin')
 
     # Clean output
-    cleaned_text = '\n'.join([line.strip() for line in text.strip().split('\n') if line.strip()])
+    cleaned_text = clean_text(text)
     print("\n--- Extracted Maithili Text ---\n")
     print(cleaned_text)
     return cleaned_text
+
+def document_pages(image_path):
+    """List the (path, page) pairs of a document; page is None for single images."""
+    if image_path.lower().endswith(('.tif', '.tiff')):
+        with Image.open(image_path) as image:
+            return [(image_path, page) for page in range(getattr(image, 'n_frames', 1))]
+    return [(image_path, None)]
+
+def _load_gray_page(image_path, page):
+    """Read one page as a grayscale array; TIFF pages are seeked to lazily."""
+    if page is None:
+        image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError(f"Could not load image: {image_path}")
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    with Image.open(image_path) as image:
+        image.seek(page)
+        return cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2GRAY)
+
+def page_dpi(image_path, page=None):
+    """Resolution of a page from its metadata, or estimated as an A4 scan."""
+    with Image.open(image_path) as image:
+        if page is not None:
+            image.seek(page)
+        dpi = image.info.get('dpi')
+        if dpi and dpi[0] > 1:
+            return float(dpi[0])
+        return max(image.size) / A4_LONG_SIDE_INCHES
+
+def downscale_to_dpi(gray, dpi, target_dpi=TARGET_DPI):
+    """Shrink a page scanned above target_dpi; returns (page, new dpi)."""
+    if dpi <= target_dpi:
+        return gray, dpi
+    scale = target_dpi / dpi
+    size = (max(int(gray.shape[1] * scale), 1), max(int(gray.shape[0] * scale), 1))
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA), target_dpi
+
+# Reduced-size decode flags, largest reduction first
+_REDUCED_READS = ((8, cv2.IMREAD_REDUCED_GRAYSCALE_8), (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+                  (2, cv2.IMREAD_REDUCED_GRAYSCALE_2))
+
+def load_page_at_dpi(image_path, page=None, target_dpi=TARGET_DPI):
+    """Read a page as grayscale at no more than target_dpi; returns (page, dpi).
+
+    Single images far above the target are decoded at 1/2, 1/4 or 1/8 size
+    directly (JPEG decoding skips most of the work), then resized the rest
+    of the way.
+    """
+    dpi = page_dpi(image_path, page)
+    if page is not None:
+        return downscale_to_dpi(_load_gray_page(image_path, page), dpi, target_dpi)
+    flag, factor = cv2.IMREAD_GRAYSCALE, 1
+    for reduction, reduced_flag in _REDUCED_READS:
+        if dpi / reduction >= target_dpi:
+            flag, factor = reduced_flag, reduction
+            break
+    gray = cv2.imread(image_path, flag)
+    if gray is None:
+        raise ValueError(f"Could not load image: {image_path}")
+    return downscale_to_dpi(gray, dpi / factor, target_dpi)
+
+def _split_region(ink, box, glyph):
+    """Cut a tall region into pieces of at most REGION_MAX_LINES lines, each
+    cut at the emptiest row (by horizontal projection profile) it can use."""
+    x, y, w, h = box
+    limit = REGION_MAX_LINES * 2 * glyph
+    if h <= limit:
+        return [box]
+    profile = np.count_nonzero(ink[y:y + h, x:x + w], axis=1)
+    cuts = [0]
+    while h - cuts[-1] > limit:
+        low = cuts[-1] + limit // 2
+        cuts.append(low + int(np.argmin(profile[low:cuts[-1] + limit])))
+    cuts.append(h)
+    return [(x, y + top, w, bottom - top) for top, bottom in zip(cuts, cuts[1:])]
+
+def _column_groups(boxes):
+    """Split boxes into groups separated by vertical gaps (no shared x range), left to right."""
+    groups, right = [], None
+    for box in sorted(boxes, key=lambda box: box[0]):
+        if right is None or box[0] >= right:
+            groups.append([])
+            right = box[0] + box[2]
+        groups[-1].append(box)
+        right = max(right, box[0] + box[2])
+    return groups
+
+def reading_order(boxes):
+    """
+    Order region boxes for reading: columns left to right, each top to bottom.
+
+    Boxes that share no x range with each other are columns. Boxes wider
+    than half of the group (headings, footers, full-width paragraphs) that
+    are all that joins the columns split the page into bands instead; each
+    band is ordered on its own, between the wide boxes above and below it.
+    Anything else is read top to bottom.
+    """
+    if len(boxes) <= 1:
+        return list(boxes)
+    columns = _column_groups(boxes)
+    if len(columns) > 1:
+        return [box for column in columns for box in reading_order(column)]
+
+    left = min(box[0] for box in boxes)
+    width = max(box[0] + box[2] for box in boxes) - left
+    wide = sorted((box for box in boxes if box[2] > width / 2), key=lambda box: box[1])
+    narrow = [box for box in boxes if box[2] <= width / 2]
+    if wide and narrow and len(_column_groups(narrow)) > 1:
+        bands = [[] for _ in range(len(wide) + 1)]
+        centers = [box[1] + box[3] / 2 for box in wide]
+        for box in narrow:
+            bands[sum(center < box[1] + box[3] / 2 for center in centers)].append(box)
+        ordered = []
+        for band, box in zip(bands, wide + [None]):
+            ordered.extend(reading_order(band))
+            if box is not None:
+                ordered.append(box)
+        return ordered
+    return sorted(boxes, key=lambda box: (box[1], box[0]))
+
+def find_text_regions(binary):
+    """
+    Bounding boxes (x, y, w, h) of the text blocks of a binarized page, in
+    reading order.
+
+    The typical glyph height is taken from the ink's connected components
+    (Devanagari words hang from one headline, so these are mostly whole
+    words). Ink is then smeared by two glyph heights across and one down,
+    joining words into lines and closely set lines into blocks; each
+    component of the result is one region. Pictures (single blobs or dense
+    areas taller than four lines) and specks are dropped. Blocks are put in
+    reading_order, then tall ones are split between lines, their pieces
+    kept together.
+    """
+    ink = cv2.bitwise_not(binary)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    heights = stats[1:count, cv2.CC_STAT_HEIGHT]
+    heights = heights[(stats[1:count, cv2.CC_STAT_AREA] >= 4) & (heights < binary.shape[0] / 8)]
+    if not len(heights):
+        return []
+    glyph = max(int(np.median(heights)), 1)
+
+    # Blobs taller than four lines or wider than any word (pictures, rules,
+    # scan borders) are not text
+    blobs = np.flatnonzero((stats[:, cv2.CC_STAT_HEIGHT] > 4 * glyph) | (stats[:, cv2.CC_STAT_WIDTH] > 30 * glyph))
+    blobs = blobs[blobs > 0]
+    if len(blobs):
+        ink[np.isin(labels, blobs)] = 0
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2 * glyph, glyph))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(cv2.dilate(ink, kernel), connectivity=8)
+
+    blocks = []
+    for x, y, w, h, _ in stats[1:count]:
+        if w < glyph or h < glyph / 2:
+            continue
+        density = np.count_nonzero(ink[y:y + h, x:x + w]) / (w * h)
+        if density > PICTURE_DENSITY and h > 4 * glyph:
+            continue
+        blocks.append((int(x), int(y), int(w), int(h)))
+
+    return [piece for block in reading_order(blocks) for piece in _split_region(ink, block, glyph)]
+
+def _ocr_region(binary, box, pad, lang):
+    x, y, w, h = box
+    crop = binary[max(y - pad, 0):y + h + pad, max(x - pad, 0):x + w + pad]
+    return clean_text(pytesseract.image_to_string(crop, lang=lang, config='--psm 6'))
+
+def ocr_page_regions(image_path, page=None, lang='hin', workers=REGION_WORKERS, target_dpi=TARGET_DPI):
+    """Like ocr_page, but only the detected text regions are sent to Tesseract.
+
+    The page is downscaled to target_dpi, binarized, and its text regions
+    are cropped and OCRed concurrently; their text is joined in reading order.
+    """
+    start = time.perf_counter()
+    with timer("ocr.preprocess"):
+        gray, dpi = load_page_at_dpi(image_path, page, target_dpi)
+        binary = binarize(gray)
+    with timer("ocr.find_regions", binary.nbytes):
+        regions = find_text_regions(binary)
+    preprocessed = time.perf_counter()
+
+    pad = max(int(dpi / 50), 1)
+    with timer("ocr.tesseract", binary.nbytes), ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        texts = list(executor.map(lambda box: _ocr_region(binary, box, pad, lang), regions))
+    return {
+        "document": image_path,
+        "page": 0 if page is None else page,
+        "text": '\n'.join(text for text in texts if text),
+        "regions": len(regions),
+        "preprocess_seconds": preprocessed - start,
+        "ocr_seconds": time.perf_counter() - preprocessed,
+    }
+
+def ocr_page(image_path, page=None, lang='hin'):
+    """Preprocess and OCR one page; returns its text and per-stage timing."""
+    start = time.perf_counter()
+    with timer("ocr.preprocess"):
+        processed = binarize(_load_gray_page(image_path, page))
+    preprocessed = time.perf_counter()
+    with timer("ocr.tesseract", processed.nbytes):
+        text = clean_text(pytesseract.image_to_string(processed, lang=lang))
+    return {
+        "document": image_path,
+        "page": 0 if page is None else page,
+        "text": text,
+        "preprocess_seconds": preprocessed - start,
+        "ocr_seconds": time.perf_counter() - preprocessed,
+    }
+
+def _ocr_page_safe(ocr, image_path, page, lang):
+    """Run ocr on one page for the batch mode; never raises.
+
+    A page that can't be read or OCRed gets empty text and an "error"
+    entry, so one bad page doesn't abort the rest of the batch.
+    """
+    start = time.perf_counter()
+    try:
+        return ocr(image_path, page, lang)
+    except Exception as e:
+        return {
+            "document": image_path,
+            "page": 0 if page is None else page,
+            "text": "",
+            "error": str(e),
+            "preprocess_seconds": time.perf_counter() - start,
+            "ocr_seconds": 0.0,
+        }
+
+def _all_pages(image_paths):
+    """(path, page) pairs of every document; an unreadable TIFF is passed on
+    as a single page so its error is reported like any other page's."""
+    for image_path in image_paths:
+        try:
+            yield from document_pages(image_path)
+        except OSError:
+            yield image_path, None
+
+def ocr_pages(image_paths, workers=1, lang='hin', regions=False):
+    """
+    OCR every page of every document across a worker pool.
+
+    Yields one result per page from ocr_page (or ocr_page_regions when
+    regions is set), in document and page order, as soon as that page and
+    all before it are done. Pages that fail have an "error" entry instead
+    of text.
+    """
+    ocr = ocr_page_regions if regions else ocr_page
+    pages = ((ocr, image_path, page, lang) for image_path, page in _all_pages(image_paths))
+    yield from ordered_map(_ocr_page_safe, pages, workers)
+
+def _output_names(image_paths):
+    """Output file name (without extension) per document: its base name, with
+    _2, _3, ... appended when documents from different folders share one."""
+    names, used = {}, set()
+    for image_path in image_paths:
+        if image_path in names:
+            continue
+        base = name = os.path.splitext(os.path.basename(image_path))[0]
+        suffix = 2
+        while name.lower() in used:
+            name = f"{base}_{suffix}"
+            suffix += 1
+        used.add(name.lower())
+        names[image_path] = name
+    return names
+
+def _write_document(output_dir, name, document, results):
+    """Write <name>.txt (pages split by form feeds) and <name>.json with timing."""
+    with open(os.path.join(output_dir, name + '.txt'), 'w', encoding='utf-8') as file:
+        file.write('\f'.join(result["text"] for result in results))
+    with open(os.path.join(output_dir, name + '.json'), 'w', encoding='utf-8') as file:
+        json.dump({"document": document, "pages": results}, file, ensure_ascii=False, indent=2)
+
+def ocr_batch(image_paths, output_dir, workers=1, lang='hin', regions=False):
+    """OCR documents page by page and write one text and timing file per document.
+
+    Documents with the same file name get distinct output names (see
+    _output_names). Returns the list of documents written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    image_paths = list(image_paths)
+    names = _output_names(image_paths)
+    written = []
+    document, results = None, []
+
+    for result in ocr_pages(image_paths, workers, lang, regions):
+        if result["document"] != document and results:
+            _write_document(output_dir, names[document], document, results)
+            written.append(document)
+            results = []
+        document = result["document"]
+        results.append(result)
+        if "error" in result:
+            print(f"{os.path.basename(document)} page {result['page'] + 1}: error: {result['error']}")
+        else:
+            print(f"{os.path.basename(document)} page {result['page'] + 1}: "
+                  f"{result['preprocess_seconds'] + result['ocr_seconds']:.2f} s")
+
+    if results:
+        _write_document(output_dir, names[document], document, results)
+        written.append(document)
+    return written
+
+def _expand_inputs(inputs):
+    """Expand directories into the image files they contain, sorted by name."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(os.path.join(item, name) for name in os.listdir(item)
+                                if name.lower().endswith(IMAGE_EXTENSIONS)))
+        else:
+            paths.append(item)
+    return paths
+
+def main(argv=None):
+    """Command-line entry point for batch OCR of page images and TIFFs."""
+    parser = argparse.ArgumentParser(description="OCR Maithili page images and multi-page TIFFs.")
+    parser.add_argument("inputs", nargs="+", help="Image files or directories of page images")
+    parser.add_argument("-o", "--output-dir", default="ocr_output", help="Directory for per-document output")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Worker processes")
+    parser.add_argument("--lang", default="hin", help="Tesseract language")
+    parser.add_argument("--regions", action="store_true",
+                        help=f"Downscale to {TARGET_DPI} DPI and OCR only the detected text regions")
+    args = parser.parse_args(argv)
+
+    ocr_batch(_expand_inputs(args.inputs), args.output_dir, args.workers, args.lang, args.regions)
+
+if __name__ == "__main__":
+    main()
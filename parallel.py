@@ -0,0 +1,27 @@
+# parallel.py
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+def ordered_map(func, items, workers=1, in_flight=2, **pool_options):
+    """
+    Yield func(*args) for every args tuple in items, in input order.
+
+    With workers > 1 the calls run in a process pool, but at most in_flight
+    tasks per worker are submitted ahead of the results consumed, so long
+    inputs are streamed with bounded memory and each result is yielded as
+    soon as it and every earlier one are done. pool_options are passed on
+    to ProcessPoolExecutor (e.g. initializer and initargs).
+    """
+    if workers <= 1:
+        for args in items:
+            yield func(*args)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, **pool_options) as executor:
+        pending = deque()
+        for args in items:
+            pending.append(executor.submit(func, *args))
+            if len(pending) >= in_flight * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
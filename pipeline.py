@@ -0,0 +1,222 @@
+# pipeline.py
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from code_mixed import process_mixed_corpus
+from metrics import format_breakdown, timer
+from ocr import extract_text_from_image
+from stt import audio
+from translate import get_backend, translate_maithili_to_english
+from transliteration import text_transliterate
+
+class Stage:
+    """One step of the pipeline: func is called with the outputs of deps, in order.
+
+    context, if given, is called before each run and its result becomes part
+    of the memo key; use it for settings outside the inputs that change the
+    output (such as the selected translation backend).
+    """
+
+    def __init__(self, name, func, deps, context=None):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.context = context
+
+def _fingerprint(value):
+    """Memo identity of a stage input; file sources are identified by their
+    content digest rather than their path."""
+    if isinstance(value, dict) and "digest" in value:
+        value = {key: item for key, item in value.items() if key != "path"}
+    return repr(value)
+
+class Pipeline:
+    """
+    Small DAG of processing stages, independent of any UI.
+
+    Stages whose dependencies are done run concurrently in a thread pool
+    (the expensive ones release the GIL or wait on the network). Each
+    stage's output is memoized by a hash of its name and inputs, so
+    re-running the same input skips work that is already done.
+    """
+
+    def __init__(self, stages, max_workers=4, memo_size=256):
+        self.stages = OrderedDict((stage.name, stage) for stage in stages)
+        self.max_workers = max_workers
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _memo_key(self, stage, args):
+        digest = hashlib.sha256(stage.name.encode('utf-8'))
+        if stage.context is not None:
+            digest.update(b"\0" + repr(stage.context()).encode('utf-8'))
+        for arg in args:
+            digest.update(b"\0" + _fingerprint(arg).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _run_stage(self, stage, args):
+        """Run one stage (or reuse its memoized output); returns (value, seconds)."""
+        start = time.perf_counter()
+        key = self._memo_key(stage, args)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key], time.perf_counter() - start
+        with timer(f"pipeline.{stage.name}"):
+            value = stage.func(*args)
+        with self._lock:
+            self._memo[key] = value
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return value, time.perf_counter() - start
+
+    def _required(self, targets):
+        """Targets plus everything they depend on."""
+        required, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name in self.stages and name not in required:
+                required.add(name)
+                stack.extend(self.stages[name].deps)
+        return required
+
+    def run(self, inputs, targets=None, on_result=None, cancel_event=None, timings=None):
+        """
+        Run the stages needed for targets (default: all).
+
+        Args:
+            inputs (dict): Values for dependency names that are not stages
+            targets (list, optional): Stage names to compute
+            on_result (callable, optional): Called as on_result(name, value)
+                from a worker thread as soon as each stage finishes
+            cancel_event (threading.Event, optional): When set, no new
+                stages are started
+            timings (dict, optional): Filled with seconds per finished stage,
+                in completion order
+
+        Returns:
+            tuple: (results, errors) dicts keyed by stage name. Stages whose
+                   dependencies failed are left out of both.
+        """
+        required = self._required(targets or list(self.stages))
+        results, errors = {}, {}
+        available = dict(inputs)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                if not (cancel_event and cancel_event.is_set()):
+                    for name in required - set(results) - set(errors) - set(running.values()):
+                        stage = self.stages[name]
+                        if any(dep in errors for dep in stage.deps):
+                            required.discard(name)
+                        elif all(dep in available for dep in stage.deps):
+                            args = [available[dep] for dep in stage.deps]
+                            running[executor.submit(self._run_stage, stage, args)] = name
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        value, seconds = future.result()
+                    except Exception as e:
+                        errors[name] = e
+                        continue
+                    results[name] = available[name] = value
+                    if timings is not None:
+                        timings[name] = seconds
+                    if on_result is not None:
+                        on_result(name, results[name])
+
+        return results, errors
+
+def make_source(mode, text=None, path=None):
+    """Describe a pipeline input; files are fingerprinted by content so memoization
+    follows the data rather than the path."""
+    source = {"mode": mode, "text": text, "path": path}
+    if path is not None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        source["digest"] = digest.hexdigest()
+    return source
+
+def extract_text(source):
+    """Stage: raw text from typed text, speech (Whisper) or an image (Tesseract)."""
+    if source["mode"] == "Speech":
+        text = audio(source["path"])
+    elif source["mode"] == "Image":
+        text = extract_text_from_image(source["path"])
+    else:
+        text = source["text"]
+    if text is None:
+        raise ValueError(f"No text could be extracted from {source['path']}")
+    return text
+
+def clean_english(translation):
+    """Stage: English output for the Clean English tab.
+
+    The translation is already plain English, so this reuses it instead of
+    translating the raw text a second time.
+    """
+    return translation
+
+# Stages that only depend on the raw text run concurrently
+def build_default_pipeline(max_workers=4):
+    """The OCR/STT -> transliterate / code-mix / translate pipeline used by the UI and CLI."""
+    return Pipeline([
+        Stage("raw", extract_text, ["source"]),
+        Stage("transliterate", text_transliterate, ["raw"]),
+        Stage("code_mix", process_mixed_corpus, ["raw"]),
+        Stage("translate", translate_maithili_to_english, ["raw"], context=lambda: get_backend().name),
+        Stage("clean_english", clean_english, ["translate"]),
+    ], max_workers=max_workers)
+
+def main(argv=None):
+    """Command-line entry point running the pipeline without the UI."""
+    parser = argparse.ArgumentParser(description="Run the Maithili processing pipeline headlessly.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--text", help="Text to process ('-' reads stdin)")
+    group.add_argument("--audio", help="Audio file to transcribe and process")
+    group.add_argument("--image", help="Image file to OCR and process")
+    parser.add_argument("--stages", default="transliterate,code_mix,translate,clean_english",
+                        help="Comma-separated stages to run")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.audio:
+        source = make_source("Speech", path=args.audio)
+    elif args.image:
+        source = make_source("Image", path=args.image)
+    else:
+        source = make_source("Text", text=sys.stdin.read() if args.text == "-" else args.text)
+
+    pipeline = build_default_pipeline()
+    targets = ["raw"] + [name for name in args.stages.split(",") if name]
+    timings = {}
+    results, errors = pipeline.run({"source": source}, targets, timings=timings)
+
+    if args.json:
+        print(json.dumps({"results": results, "errors": {name: str(e) for name, e in errors.items()},
+                          "timings": timings}, ensure_ascii=False, indent=2))
+    else:
+        for name in targets:
+            if name in results:
+                print(f"--- {name} ---\n{results[name]}\n")
+            elif name in errors:
+                print(f"--- {name} ---\nError: {errors[name]}\n")
+        print(format_breakdown(timings))
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
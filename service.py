@@ -0,0 +1,355 @@
+# service.py
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from code_mixed import identify_languages
+from metrics import registry as metrics
+from ocr import extract_text_from_image
+from stt import audio
+from translate import translate_texts_async
+from transliteration import text_transliterate
+
+# Default concurrency limit per stage; Whisper and Tesseract are the heavy ones
+STAGE_LIMITS = {"stt": 1, "ocr": 2, "translate": 4, "langid": 2, "transliterate": 4}
+
+# Largest request body accepted, in bytes
+MAX_BODY = 50 * 1024 * 1024
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error"}
+
+class MicroBatcher:
+    """
+    Collects single requests into batches for an expensive stage.
+
+    A batch is flushed when it reaches max_batch items or max_wait seconds
+    after its first item arrived. batch_func takes a list of items and
+    returns a list of results in the same order; it may be a coroutine
+    function or a blocking function, which runs in the executor. At most
+    `concurrency` batches of one stage run at a time.
+    """
+
+    def __init__(self, name, batch_func, executor, max_batch=32, max_wait=0.01, concurrency=1):
+        self.name = name
+        self.batch_func = batch_func
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.queue = asyncio.Queue()
+        self.stats = {"requests": 0, "batches": 0, "items": 0}
+        self._task = None
+        self._running = set()
+
+    async def submit(self, item):
+        """Queue one item and wait for its result."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._collect())
+        future = asyncio.get_running_loop().create_future()
+        self.stats["requests"] += 1
+        await self.queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self.semaphore.acquire()
+            # Keep a reference so the task is not collected while it runs
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            if inspect.iscoroutinefunction(self.batch_func):
+                results = await self.batch_func(items)
+            else:
+                results = await asyncio.get_running_loop().run_in_executor(self.executor, self.batch_func, items)
+            self.stats["batches"] += 1
+            self.stats["items"] += len(items)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.semaphore.release()
+
+def _langid_batch(token_lists):
+    """Label every token of every request with one identify_languages call."""
+    flat = [token for tokens in token_lists for token in tokens]
+    labels = list(identify_languages(flat))
+    results, start = [], 0
+    for tokens in token_lists:
+        results.append(labels[start:start + len(tokens)])
+        start += len(tokens)
+    return results
+
+class MaithiliService:
+    """Text, speech and image pipelines behind micro-batched, rate-limited stages."""
+
+    def __init__(self, limits=None, max_batch=32, max_wait=0.01):
+        self.limits = dict(STAGE_LIMITS, **(limits or {}))
+        self.executor = ThreadPoolExecutor(max_workers=sum(self.limits.values()))
+        self.semaphores = {}
+        self.batchers = {}
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.started = time.time()
+
+    def _setup(self):
+        """Create loop-bound primitives once the event loop is running."""
+        self.semaphores = {name: asyncio.Semaphore(limit) for name, limit in self.limits.items()}
+        self.batchers = {
+            "langid": MicroBatcher("langid", _langid_batch, self.executor, self.max_batch,
+                                   self.max_wait, self.limits["langid"]),
+            # Texts are split into sentences and put back together per request
+            "translate": MicroBatcher("translate", translate_texts_async, self.executor, self.max_batch,
+                                      self.max_wait, self.limits["translate"]),
+        }
+
+    async def _in_executor(self, stage, func, *args):
+        async with self.semaphores[stage]:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def process_text(self, text, stages=None):
+        """Run the requested text stages concurrently on one input."""
+        stages = stages or ["transliterate", "code_mix", "translate"]
+        tasks = {}
+        if "transliterate" in stages:
+            tasks["transliterate"] = self._in_executor("transliterate", text_transliterate, text)
+        if "code_mix" in stages:
+            tasks["code_mix"] = self._code_mix(text)
+        if "translate" in stages:
+            tasks["translate"] = self.batchers["translate"].submit(text)
+        values = await asyncio.gather(*tasks.values())
+        return dict({"raw": text}, **dict(zip(tasks, values)))
+
+    async def _code_mix(self, text):
+        words = text.split()
+        labels = await self.batchers["langid"].submit(words)
+        return [f"{word}: {label}" for word, label in zip(words, labels)]
+
+    async def process_speech(self, path, stages=None):
+        text = await self._in_executor("stt", audio, path)
+        return await self.process_text(text, stages)
+
+    async def process_image(self, path, stages=None):
+        text = await self._in_executor("ocr", extract_text_from_image, path)
+        if text is None:
+            raise ValueError("No text could be extracted from the image")
+        return await self.process_text(text, stages)
+
+    def stats(self):
+        return {
+            "uptime_seconds": time.time() - self.started,
+            "limits": self.limits,
+            "batchers": {name: batcher.stats for name, batcher in self.batchers.items()},
+        }
+
+    async def handle(self, method, path, headers, body):
+        """Route one request; returns (status, payload). Strings are sent as plain text, anything else as JSON."""
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/stats":
+            return 200, self.stats()
+        if path == "/metrics":
+            return 200, metrics.to_prometheus()
+        if path == "/metrics.json":
+            return 200, metrics.snapshot()
+        if path not in ("/text", "/speech", "/image", "/langid"):
+            return 404, {"error": f"Unknown path: {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST"}
+
+        content_type = headers.get("content-type", "")
+        if content_type.startswith("application/json"):
+            request = json.loads(body or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("JSON body must be an object")
+        else:
+            request = {}
+
+        if path == "/text":
+            return 200, await self.process_text(request["text"], request.get("stages"))
+        if path == "/langid":
+            labels = await self.batchers["langid"].submit(request["tokens"])
+            return 200, {"labels": labels}
+
+        # Speech and image take only the uploaded file as the body, never a server-side path
+        process = self.process_speech if path == "/speech" else self.process_image
+        if content_type.startswith("application/json"):
+            return 400, {"error": "Send the file itself as the request body"}
+        suffix = headers.get("x-filename", "upload.wav" if path == "/speech" else "upload.png")
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(suffix)[1], delete=False) as upload:
+            upload.write(body)
+        try:
+            return 200, await process(upload.name)
+        finally:
+            os.unlink(upload.name)
+
+    async def serve_connection(self, reader, writer):
+        """Minimal HTTP/1.1 with keep-alive: one JSON response per request."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode('latin-1').split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": "Request body too large"}
+                    body = None
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, payload = await self.handle(method, target.split("?", 1)[0], headers, body)
+                    except (KeyError, ValueError) as e:
+                        status, payload = 400, {"error": str(e)}
+                    except Exception as e:
+                        status, payload = 500, {"error": str(e)}
+
+                if isinstance(payload, str):
+                    data, content_type = payload.encode('utf-8'), "text/plain; version=0.0.4"
+                else:
+                    data, content_type = json.dumps(payload, ensure_ascii=False).encode('utf-8'), "application/json"
+                keep_alive = body is not None and headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        self._setup()
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        print(f"Serving on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+async def _client_request(reader, writer, path, payload):
+    """Send one JSON POST on a kept-alive connection and read the response."""
+    data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    await reader.readexactly(length)
+    return status
+
+async def load_test(host, port, path, payload, requests=1000, concurrency=32):
+    """
+    Bundled load generator: `concurrency` kept-alive connections send
+    `requests` POSTs in total. Returns latency percentiles and throughput.
+    """
+    latencies, failures = [], 0
+    remaining = [requests]
+
+    async def worker():
+        nonlocal failures
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                start = time.perf_counter()
+                status = await _client_request(reader, writer, path, payload)
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    failures += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+    return {
+        "requests": len(latencies),
+        "failures": failures,
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+    }
+
+def main(argv=None):
+    """Command-line entry point: `serve` the API or run the `loadgen` against it."""
+    parser = argparse.ArgumentParser(description="Local Maithili processing service.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Run the HTTP service")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--max-batch", type=int, default=32, help="Largest micro-batch per stage")
+    serve.add_argument("--max-wait-ms", type=float, default=10.0, help="Longest wait to fill a batch")
+    for stage, limit in STAGE_LIMITS.items():
+        serve.add_argument(f"--{stage}-limit", type=int, default=limit, help=f"Concurrent {stage} batches")
+
+    loadgen = commands.add_parser("loadgen", help="Measure latency and throughput of a running service")
+    loadgen.add_argument("--host", default="127.0.0.1")
+    loadgen.add_argument("--port", type=int, default=8765)
+    loadgen.add_argument("--path", default="/langid", help="Endpoint to load")
+    loadgen.add_argument("--payload", default='{"tokens": ["hello", "kya", "tum", "aaj", "free", "ho"]}',
+                         help="JSON request body")
+    loadgen.add_argument("--requests", type=int, default=1000)
+    loadgen.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        limits = {stage: getattr(args, f"{stage}_limit") for stage in STAGE_LIMITS}
+        service = MaithiliService(limits, args.max_batch, args.max_wait_ms / 1000)
+        try:
+            asyncio.run(service.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        report = asyncio.run(load_test(args.host, args.port, args.path, json.loads(args.payload),
+                                       args.requests, args.concurrency))
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+# spell_correction.py
+import os
+import re
+import struct
+from collections import Counter
+
+import numpy as np
+
+# Get the current script directory
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Word list the default index is built from, and where the index is saved
+LEXICON_SOURCES = ("maithili_corpus.txt",)
+INDEX_PATH = os.path.join(script_dir, "corpus", "spell_index.bin")
+INDEX_MAGIC = b"MSI1"
+
+MAX_EDIT_DISTANCE = 2
+PREFIX_LENGTH = 7
+
+# Devanagari grapheme clusters: a consonant with any virama-joined consonants
+# (conjuncts), then nukta, matras, virama or other marks; any other
+# character takes the combining marks that follow it
+_CONSONANT = '[क-हक़-य़ॸ-ॿ]'
+_MARK = '[ऀ-ःऺ-ॏ॑-ॗॢॣ‌‍]'
+_cluster_pattern = re.compile(
+    f'{_CONSONANT}़?(?:्‍?{_CONSONANT}़?)*{_MARK}*|.{_MARK}*',
+    re.DOTALL,
+)
+
+# Encoded clusters are private-use code points starting here
+_CLUSTER_BASE = 0xF0000
+
+def grapheme_clusters(word):
+    """Split a word into Devanagari grapheme clusters (one character each for Roman)."""
+    return _cluster_pattern.findall(word)
+
+def edit_distance(a, b, max_distance):
+    """Optimal string alignment distance between a and b, or max_distance + 1
+    as soon as it is certain to exceed max_distance."""
+    # Common prefixes and suffixes never cost anything
+    start = 0
+    end_a, end_b = len(a), len(b)
+    while start < end_a and start < end_b and a[start] == b[start]:
+        start += 1
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if not a or not b:
+        return len(a) or len(b)
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        char = a[i - 1]
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            value = previous[j - 1] + (char != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1] and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= max_distance else max_distance + 1
+
+def _deletes(encoded, max_distance):
+    """Strings reachable from encoded by deleting up to max_distance clusters,
+    as one set per number of deletions (the first is {encoded})."""
+    levels = [{encoded}]
+    seen = {encoded}
+    for _ in range(max_distance):
+        level = set()
+        for item in levels[-1]:
+            for i in range(len(item)):
+                level.add(item[:i] + item[i + 1:])
+        level -= seen
+        if not level:
+            break
+        seen |= level
+        levels.append(level)
+    return levels
+
+class SpellIndex:
+    """
+    Symmetric-delete (SymSpell-style) spelling index over grapheme clusters.
+
+    Each cluster is encoded as one private-use character, so edits count
+    whole aksharas rather than code points. Dictionary words are indexed
+    by every deletion of up to max_edit_distance clusters from their first
+    prefix_length clusters; a lookup generates the same deletions for the
+    query and verifies the candidates with an edit distance.
+
+    The deletions are kept as a flat posting list (word ids grouped by
+    deletion, with one offset per deletion), which is also the on-disk layout.
+    """
+
+    def __init__(self, max_edit_distance=MAX_EDIT_DISTANCE, prefix_length=PREFIX_LENGTH):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.alphabet = {}
+        self.words = []
+        self.frequencies = []
+        self.encoded = []
+        self._slots = {}
+        self._offsets = [0]
+        self._postings = []
+
+    def __len__(self):
+        return len(self.words)
+
+    def _encode(self, word, grow=False):
+        """Encode a word cluster by cluster; unseen clusters get a fresh code
+        when building and a code that matches nothing when looking up."""
+        codes = []
+        for cluster in grapheme_clusters(word):
+            code = self.alphabet.get(cluster)
+            if code is None:
+                if not grow:
+                    codes.append('\uffff')
+                    continue
+                code = self.alphabet[cluster] = chr(_CLUSTER_BASE + len(self.alphabet))
+            codes.append(code)
+        return "".join(codes)
+
+    @classmethod
+    def build(cls, frequencies, max_edit_distance=MAX_EDIT_DISTANCE, prefix_length=PREFIX_LENGTH):
+        """Build an index from a {word: frequency} mapping."""
+        index = cls(max_edit_distance, prefix_length)
+        deletes = {}
+        for word, frequency in sorted(frequencies.items()):
+            encoded = index._encode(word, grow=True)
+            word_id = len(index.words)
+            index.words.append(word)
+            index.frequencies.append(frequency)
+            index.encoded.append(encoded)
+            for level in _deletes(encoded[:prefix_length], max_edit_distance):
+                for delete in level:
+                    deletes.setdefault(delete, []).append(word_id)
+
+        for slot, (delete, word_ids) in enumerate(deletes.items()):
+            index._slots[delete] = slot
+            index._postings.extend(word_ids)
+            index._offsets.append(len(index._postings))
+        return index
+
+    def lookup(self, word, max_edit_distance=None):
+        """Return the closest dictionary words as [(word, distance, frequency)],
+        most frequent first, or [] if none is within max_edit_distance.
+
+        At least one cluster of the word must survive, so single-cluster
+        words are only matched exactly and two-cluster words within one edit.
+        Deletions are probed in order of how many clusters they remove, and
+        the search stops as soon as that exceeds the best distance found.
+        """
+        query = self._encode(word)
+        query_length = len(query)
+        max_distance = self.max_edit_distance if max_edit_distance is None else min(
+            max_edit_distance, self.max_edit_distance)
+        max_distance = min(max_distance, query_length - 1)
+        slots, offsets, postings = self._slots, self._offsets, self._postings
+        encoded, prefix_length = self.encoded, self.prefix_length
+
+        best, seen, matches = max_distance, set(), []
+        for removed, level in enumerate(_deletes(query[:prefix_length], max_distance)):
+            if removed > best:
+                break
+            for delete in level:
+                slot = slots.get(delete)
+                if slot is None:
+                    continue
+                delete_length = len(delete)
+                for word_id in postings[offsets[slot]:offsets[slot + 1]]:
+                    if word_id in seen:
+                        continue
+                    candidate = encoded[word_id]
+                    # A word that needs more deletions than best to reach this
+                    # delete is either too far or found through a shorter one
+                    if min(len(candidate), prefix_length) - delete_length > best:
+                        continue
+                    seen.add(word_id)
+                    if abs(len(candidate) - query_length) > best:
+                        continue
+                    distance = 0 if candidate == query else edit_distance(query, candidate, best)
+                    if distance < best:
+                        best, matches = distance, []
+                    if distance == best:
+                        matches.append(word_id)
+        return sorted(((self.words[i], best, self.frequencies[i]) for i in matches),
+                      key=lambda match: -match[2])
+
+    def correct(self, word):
+        """Best correction for word, or word itself if nothing is close enough."""
+        matches = self.lookup(word)
+        return matches[0][0] if matches else word
+
+    def save(self, path=INDEX_PATH):
+        """Write the index to a compact binary file.
+
+        Layout: magic, uint32 max_edit_distance, prefix_length, word count
+        and deletion count; then the newline-joined clusters (in code order),
+        words and deletions as length-prefixed UTF-8 blocks; then uint32
+        frequencies, deletion offsets and postings.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        clusters = sorted(self.alphabet, key=self.alphabet.get)
+        blocks = [
+            "\n".join(clusters).encode('utf-8'),
+            "\n".join(self.words).encode('utf-8'),
+            "\n".join(self._slots).encode('utf-8'),
+        ]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(INDEX_MAGIC + struct.pack('<4I', self.max_edit_distance, self.prefix_length,
+                                                 len(self.words), len(self._slots)))
+            for block in blocks:
+                file.write(struct.pack('<Q', len(block)) + block)
+            for values in (self.frequencies, self._offsets, self._postings):
+                file.write(np.asarray(values, dtype='<u4').tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """Read an index written by save(), or return None if it is unusable."""
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            if data[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+                return None
+            position = len(INDEX_MAGIC)
+            max_edit_distance, prefix_length, n_words, n_deletes = struct.unpack_from('<4I', data, position)
+            position += 16
+            blocks = []
+            for _ in range(3):
+                (size,) = struct.unpack_from('<Q', data, position)
+                position += 8
+                block = data[position:position + size].decode('utf-8')
+                blocks.append(block.split("\n"))
+                position += size
+            arrays = []
+            for count in (n_words, n_deletes + 1, None):
+                array = np.frombuffer(data, dtype='<u4', count=-1 if count is None else count, offset=position)
+                arrays.append(array.tolist())
+                position += array.nbytes
+        except (OSError, struct.error, ValueError):
+            return None
+
+        index = cls(max_edit_distance, prefix_length)
+        clusters, words, deletes = blocks
+        index.words = words if n_words else []
+        index.alphabet = {cluster: chr(_CLUSTER_BASE + code) for code, cluster in enumerate(clusters) if cluster}
+        index.frequencies, index._offsets, index._postings = arrays
+        index._slots = {delete: slot for slot, delete in enumerate(deletes[:n_deletes])}
+        index.encoded = [index._encode(word) for word in index.words]
+        return index
+
+def word_frequencies(filenames):
+    """Count whitespace-separated words across the given corpus files."""
+    counts = Counter()
+    for filename in filenames:
+        path = filename if os.path.isabs(filename) else os.path.join(script_dir, filename)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    counts.update(line.split())
+        except FileNotFoundError:
+            print(f"Error: File '{filename}' not found.")
+    return counts
+
+# Index for correct_text, loaded lazily once per process
+_index = None
+
+def load_spell_index(sources=LEXICON_SOURCES, path=INDEX_PATH):
+    """Return the saved index, building and saving it if missing or older than a source."""
+    global _index
+    if _index is not None:
+        return _index
+
+    source_paths = [s if os.path.isabs(s) else os.path.join(script_dir, s) for s in sources]
+    newest = max((os.path.getmtime(p) for p in source_paths if os.path.exists(p)), default=0)
+    index = None
+    if os.path.exists(path) and os.path.getmtime(path) >= newest:
+        index = SpellIndex.load(path)
+    if index is None:
+        index = SpellIndex.build(word_frequencies(sources))
+        index.save(path)
+
+    _index = index
+    return _index
+
+def correct_text(text):
+    """Replace each word with its best correction from the lexicon index."""
+    index = load_spell_index()
+    return " ".join(index.correct(word) for word in text.split())
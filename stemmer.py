@@ -0,0 +1,151 @@
+# stemmer.py
+import threading
+from collections import OrderedDict
+
+from metrics import instrument
+
+# Maithili inflectional suffixes (case markers, plurals, verb endings), in
+# both scripts; the longest one that leaves a long enough stem is removed
+DEVANAGARI_SUFFIXES = [
+    "क", "ाक", "ेक", "ीक", "क़", "के", "केँ", "कें", "सँ", "सं", "सौं", "मे", "में", "पर", "लेल",
+    "सभ", "सभक", "सभकेँ", "सब", "सबहक", "गण", "लोकनि", "निक", "नि", "हुँ", "हि", "ेँ",
+    "ैत", "त", "ताह", "तैक", "ल", "लक", "लनि", "लहुँ", "लौं", "लन्हि", "लैक", "ब", "बाक",
+    "बैक", "ए", "ओ", "ी", "ा", "ें", "ों",
+]
+ROMAN_SUFFIXES = [
+    "ak", "ek", "ik", "ke", "ken", "san", "saun", "me", "mein", "par", "lel",
+    "sabh", "sabhak", "sab", "sabahak", "gan", "lokani", "nik", "ni", "hun", "hi",
+    "ait", "at", "tah", "taik", "al", "lak", "lani", "lahun", "laun", "lanhi", "laik",
+    "ab", "baak", "baik",
+]
+SUFFIXES = DEVANAGARI_SUFFIXES + ROMAN_SUFFIXES
+
+# Characters a stem must keep, and how many token types stem() remembers
+MIN_STEM_LENGTH = 2
+CACHE_SIZE = 100000
+
+_VIRAMA = '्'
+
+class SuffixAutomaton:
+    """
+    Suffix list compiled into a trie over reversed suffixes.
+
+    Each state is a dict of transitions; walking a token backwards from its
+    last character visits every suffix that matches in one pass, so the
+    longest match is simply the last accepting state reached.
+    """
+
+    def __init__(self, suffixes):
+        self._transitions = [{}]
+        self._accepting = [False]
+        for suffix in suffixes:
+            state = 0
+            for char in reversed(suffix):
+                next_state = self._transitions[state].get(char)
+                if next_state is None:
+                    next_state = self._transitions[state][char] = len(self._transitions)
+                    self._transitions.append({})
+                    self._accepting.append(False)
+                state = next_state
+            self._accepting[state] = True
+
+    def __len__(self):
+        return len(self._transitions)
+
+    def longest_suffix(self, word, min_stem=MIN_STEM_LENGTH):
+        """Length of the longest suffix of word that leaves at least min_stem
+        characters and does not split a conjunct (stem ending in a virama)."""
+        transitions, accepting = self._transitions, self._accepting
+        state, best, i = 0, 0, len(word)
+        while i > min_stem:
+            state = transitions[state].get(word[i - 1])
+            if state is None:
+                break
+            i -= 1
+            if accepting[state] and word[i - 1] != _VIRAMA:
+                best = len(word) - i
+        return best
+
+class Stemmer:
+    """Suffix-stripping stemmer memoized per token type in a bounded LRU."""
+
+    def __init__(self, suffixes=SUFFIXES, min_stem=MIN_STEM_LENGTH, cache_size=CACHE_SIZE):
+        self.automaton = SuffixAutomaton(suffixes)
+        self.min_stem = min_stem
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _strip(self, token):
+        length = self.automaton.longest_suffix(token, self.min_stem)
+        return token[:-length] if length else token
+
+    def _remember(self, stems):
+        """Add {token: stem} to the LRU, evicting the oldest entries; call with the lock held."""
+        self._cache.update(stems)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def stem(self, token):
+        """Stem of one token."""
+        with self._lock:
+            stem = self._cache.get(token)
+            if stem is not None:
+                self._cache.move_to_end(token)
+                self.hits += 1
+                return stem
+        stem = self._strip(token)
+        with self._lock:
+            self.misses += 1
+            self._remember({token: stem})
+        return stem
+
+    def stem_many(self, tokens):
+        """Stems of a sequence of tokens, in order.
+
+        Tokens are collapsed to distinct types first, so each type is looked
+        up in the LRU (and stemmed, on a miss) once per batch and the lock is
+        taken twice per batch rather than per token.
+        """
+        types = dict.fromkeys(tokens)
+        cache = self._cache
+        with self._lock:
+            for token in types:
+                stem = cache.get(token)
+                if stem is not None:
+                    cache.move_to_end(token)
+                    types[token] = stem
+        missing = {token: self._strip(token) for token, stem in types.items() if stem is None}
+        with self._lock:
+            self.hits += len(types) - len(missing)
+            self.misses += len(missing)
+            self._remember(missing)
+        types.update(missing)
+        return list(map(types.__getitem__, tokens))
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._cache), "capacity": self.cache_size, "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+# Shared stemmer for the module-level helpers
+stemmer = Stemmer()
+
+def stem(token):
+    """Stem of one token using the shared stemmer."""
+    return stemmer.stem(token)
+
+@instrument("stemmer.stem_many")
+def stem_many(tokens):
+    """Stems of a list of tokens using the shared stemmer."""
+    return stemmer.stem_many(tokens)
+
+def stem_text(text):
+    """Stem every whitespace-separated word of text."""
+    return " ".join(stem_many(text.split()))
@@ -1,10 +1,453 @@
 # stt.py
-import whisper
+import argparse
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-# Load the Whisper model once globally (can be moved to a class if needed)
-model = whisper.load_model("base")
+import numpy as np
 
-def audio(file_path):
+from metrics import timer
+from parallel import ordered_map
+
+# Whisper decodes audio to 16 kHz mono
+SAMPLE_RATE = 16000
+
+# Longest run of words compared when stitching overlapping windows
+MAX_OVERLAP_WORDS = 30
+
+# Audio files whose content hash the PCM cache remembers
+PCM_DIGEST_ENTRIES = 4096
+
+# Get the current script directory
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Model settings; override with configure() or the environment
+config = {
+    "size": os.environ.get("MAITHILI_WHISPER_MODEL", "base"),
+    "device": os.environ.get("MAITHILI_WHISPER_DEVICE", "cpu"),
+    "fp16": os.environ.get("MAITHILI_WHISPER_FP16", "0").lower() in ("1", "true", "yes"),
+    "memory_budget_mb": float(os.environ.get("MAITHILI_WHISPER_BUDGET_MB", "0")) or None,
+    # Decoded-audio cache: directory and size limit (0 disables it)
+    "pcm_cache_dir": os.environ.get("MAITHILI_PCM_CACHE_DIR", os.path.join(script_dir, "corpus", "pcm_cache")),
+    "pcm_cache_mb": float(os.environ.get("MAITHILI_PCM_CACHE_MB", "2048")),
+}
+
+def configure(**settings):
+    """Update model settings (size, device, fp16, memory_budget_mb, pcm_cache_dir, pcm_cache_mb)."""
+    unknown = set(settings) - set(config)
+    if unknown:
+        raise ValueError(f"Unknown STT settings: {', '.join(sorted(unknown))}")
+    config.update(settings)
+    registry.memory_budget_mb = config["memory_budget_mb"]
+
+def _model_bytes(model):
+    """Approximate memory held by a model's parameters and buffers."""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+class ModelRegistry:
+    """Process-wide cache of loaded Whisper models, keyed by (size, device).
+
+    Models are loaded on first request. When a memory budget is set, the
+    least recently used models are evicted until the loaded set fits.
+    """
+
+    def __init__(self, memory_budget_mb=None):
+        self.memory_budget_mb = memory_budget_mb
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, size=None, device=None):
+        """Return the model for (size, device), loading it if needed."""
+        key = (size or config["size"], device or config["device"])
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+
+            import whisper  # Deferred so importing stt stays cheap
+            with timer("stt.load_model"):
+                model = whisper.load_model(key[0], device=key[1])
+            self._models[key] = (model, _model_bytes(model))
+            self._enforce_budget(keep=key)
+            return model
+
+    def _enforce_budget(self, keep):
+        """Evict least recently used models until within the memory budget."""
+        if not self.memory_budget_mb:
+            return
+        budget = self.memory_budget_mb * 1024 * 1024
+        for key in list(self._models):
+            if self.memory_used() <= budget:
+                break
+            if key != keep:
+                del self._models[key]
+
+    def evict(self, size, device=None):
+        """Drop a loaded model; returns True if it was loaded."""
+        with self._lock:
+            return self._models.pop((size, device or config["device"]), None) is not None
+
+    def clear(self):
+        """Drop every loaded model."""
+        with self._lock:
+            self._models.clear()
+
+    def loaded(self):
+        """Keys of the loaded models, least recently used first."""
+        return list(self._models)
+
+    def memory_used(self):
+        """Approximate bytes held by the loaded models."""
+        return sum(size for _, size in self._models.values())
+
+# Shared by every caller in the process
+registry = ModelRegistry(config["memory_budget_mb"])
+
+def get_model(size=None, device=None):
+    """Return a Whisper model from the process-wide registry."""
+    return registry.get(size, device)
+
+class PCMCache:
+    """
+    Decoded 16 kHz samples on disk, one .npy file per source file content.
+
+    Entries are keyed by the SHA-256 of the audio file, so a renamed or
+    copied file still hits and an edited one misses. Hits are memory-mapped
+    (copy-on-write) instead of re-running ffmpeg. The directory is shared
+    by every process; once it grows past config["pcm_cache_mb"], the least
+    recently used entries (by file mtime, refreshed on every hit) are
+    deleted.
+    """
+
+    def __init__(self, digest_entries=PCM_DIGEST_ENTRIES):
+        self.digest_entries = digest_entries
+        self._digests = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self):
+        return config["pcm_cache_dir"]
+
+    @property
+    def enabled(self):
+        return config["pcm_cache_mb"] > 0
+
+    def key(self, file_path):
+        """Content hash of file_path, remembered per (path, mtime, size) for
+        the digest_entries most recently used files."""
+        st = os.stat(file_path)
+        signature = (os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+        with self._lock:
+            digest = self._digests.get(signature)
+            if digest is not None:
+                self._digests.move_to_end(signature)
+                return digest
+        hasher = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        with self._lock:
+            self._digests[signature] = digest
+            while len(self._digests) > self.digest_entries:
+                self._digests.popitem(last=False)
+        return digest
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    def get(self, key):
+        """Memory-mapped samples for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            samples = np.load(path, mmap_mode='c')
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass  # Read-only cache: still a hit
+        with self._lock:
+            self.hits += 1
+        return samples
+
+    def put(self, key, samples):
+        """Store samples under key, then evict down to the size limit.
+
+        Raises OSError if the directory can't be written (read-only, full).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as file:
+                np.save(file, np.asarray(samples, dtype=np.float32))
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict(keep=path)
+
+    def _entries(self):
+        """(mtime, size, path) of every cached file, oldest first."""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(".npy"):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue  # Evicted by another process meanwhile
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        return sorted(entries)
+
+    def _evict(self, keep=None):
+        """Delete least recently used entries until within the size limit."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        limit = config["pcm_cache_mb"] * 1024 * 1024
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self):
+        entries = self._entries() if os.path.isdir(self.directory) else []
+        with self._lock:
+            return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries),
+                    "limit_bytes": int(config["pcm_cache_mb"] * 1024 * 1024),
+                    "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        """Delete every cached entry."""
+        if os.path.isdir(self.directory):
+            for _, _, path in self._entries():
+                os.remove(path)
+
+# Shared by every caller in the process
+pcm_cache = PCMCache()
+
+def audio(file_path, model_size=None):
     """Transcribes speech from the given audio file in Hindi."""
-    result = model.transcribe(file_path, language="hi")
+    model = get_model(model_size)
+    samples = load_audio(file_path)
+    with timer("stt.transcribe", os.path.getsize(file_path)):
+        result = model.transcribe(samples, language="hi", fp16=config["fp16"])
     return result["text"]
+
+def load_audio(file_path):
+    """Decode an audio file to 16 kHz mono float32 samples.
+
+    Decoded samples are kept in the PCM cache, so decoding the same audio
+    again maps the cached file instead of running ffmpeg.
+    """
+    if not pcm_cache.enabled:
+        return _decode(file_path)
+    key = pcm_cache.key(file_path)
+    with timer("stt.pcm_cache_lookup"):
+        samples = pcm_cache.get(key)
+    if samples is None:
+        samples = _decode(file_path)
+        try:
+            pcm_cache.put(key, samples)
+        except OSError as e:
+            # A cache that can't be written only costs the next decode
+            print(f"Error writing PCM cache entry for '{file_path}': {e}")
+    return samples
+
+def _decode(file_path):
+    """Decode with Whisper's ffmpeg wrapper."""
+    import whisper
+    with timer("stt.decode", os.path.getsize(file_path)):
+        return whisper.load_audio(file_path)
+
+def _silence_cut(samples, start, end, search):
+    """Return the quietest 20 ms frame boundary in [end - search, end]."""
+    frame = SAMPLE_RATE // 50
+    region = samples[max(start, end - search):end]
+    frames = len(region) // frame
+    if frames < 2:
+        return end
+    energy = np.square(region[:frames * frame].reshape(frames, frame)).mean(axis=1)
+    return end - len(region) + int(np.argmin(energy)) * frame + frame // 2
+
+def split_windows(samples, window_s=30.0, overlap_s=5.0, cut_at_silence=False):
+    """
+    Split samples into overlapping (start, end) sample ranges.
+
+    With cut_at_silence, each window ends at the quietest point of its last
+    overlap_s seconds instead of exactly window_s after its start.
+    """
+    if window_s <= 2 * overlap_s:
+        raise ValueError("window_s must be more than twice overlap_s")
+
+    window = int(window_s * SAMPLE_RATE)
+    overlap = int(overlap_s * SAMPLE_RATE)
+    windows = []
+    start = 0
+    while start < len(samples):
+        end = min(start + window, len(samples))
+        if cut_at_silence and end < len(samples):
+            end = _silence_cut(samples, start, end, overlap)
+        windows.append((start, end))
+        if end == len(samples):
+            break
+        start = end - overlap
+    return windows
+
+def _normalize_word(word):
+    """Compare words without case or trailing punctuation."""
+    return word.strip(".,?!।॥").lower()
+
+def stitch_words(previous, text, max_overlap=MAX_OVERLAP_WORDS):
+    """Return the words of text left after dropping the longest prefix that
+    repeats the tail of previous (the words already emitted)."""
+    words = text.split()
+    tail = [_normalize_word(word) for word in previous[-max_overlap:]]
+    head = [_normalize_word(word) for word in words[:max_overlap]]
+    for k in range(min(len(tail), len(head)), 0, -1):
+        if tail[-k:] == head[:k]:
+            return words[k:]
+    return words
+
+def _init_worker(settings, preload=False):
+    """Process pool initializer: apply the parent's model settings and
+    optionally load the model up front so each worker loads it once."""
+    configure(**settings)
+    if preload:
+        get_model()
+
+def _transcribe_samples(samples, model_size=None):
+    """Transcribe one window of 16 kHz samples."""
+    model = get_model(model_size)
+    with timer("stt.transcribe", samples.nbytes):
+        return model.transcribe(samples, language="hi", fp16=config["fp16"])["text"]
+
+def audio_stream(file_path, window_s=30.0, overlap_s=5.0, cut_at_silence=False,
+                 workers=1, model_size=None):
+    """
+    Transcribe a long audio file window by window.
+
+    Yields the new text of each window as soon as it and every earlier
+    window are done, with words repeated from the overlap removed. With
+    workers > 1 windows are decoded in worker processes, each holding its
+    own model.
+    """
+    samples = load_audio(file_path)
+    windows = split_windows(samples, window_s, overlap_s, cut_at_silence)
+    emitted = []
+
+    def stitched(text):
+        words = stitch_words(emitted, text)
+        emitted.extend(words)
+        del emitted[:-MAX_OVERLAP_WORDS]
+        return " ".join(words)
+
+    items = ((samples[start:end], model_size) for start, end in windows)
+    for text in ordered_map(_transcribe_samples, items, workers,
+                            initializer=_init_worker, initargs=(dict(config),)):
+        yield stitched(text)
+
+def _transcribe_file(file_path, model_size=None):
+    """Transcribe one file for the batch runner; never raises."""
+    start = time.perf_counter()
+    try:
+        samples = load_audio(file_path)
+        text = _transcribe_samples(samples, model_size)
+        entry = {"text": text, "audio_seconds": len(samples) / SAMPLE_RATE}
+    except Exception as e:
+        entry = {"error": str(e)}
+    entry["wall_seconds"] = time.perf_counter() - start
+    return entry
+
+def read_manifest(manifest_path):
+    """Return the manifest entries of files transcribed without error."""
+    done = {}
+    if not os.path.exists(manifest_path):
+        return done
+    with open(manifest_path, 'r', encoding='utf-8') as manifest:
+        for line in manifest:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Partial line left by an interrupted run
+            if "error" not in entry:
+                done[entry["file"]] = entry
+    return done
+
+def transcribe_batch(input_dir, manifest_path, pattern="*.wav", workers=1, model_size=None):
+    """
+    Transcribe every matching file under input_dir into a JSONL manifest.
+
+    Each result is appended to the manifest as soon as it completes, and
+    files already recorded there without an error are skipped, so an
+    interrupted run can simply be started again.
+
+    Returns:
+        dict: Counts, total audio and wall seconds, and throughput in
+              audio-seconds per wall-second
+    """
+    files = sorted(glob.glob(os.path.join(input_dir, "**", pattern), recursive=True))
+    done = read_manifest(manifest_path)
+    todo = [path for path in files if os.path.relpath(path, input_dir) not in done]
+
+    summary = {"files": len(files), "skipped": len(files) - len(todo), "transcribed": 0,
+               "failed": 0, "audio_seconds": 0.0}
+    start = time.perf_counter()
+
+    if todo:
+        with open(manifest_path, 'a', encoding='utf-8') as manifest, \
+                ProcessPoolExecutor(max_workers=max(workers, 1), initializer=_init_worker,
+                                    initargs=(dict(config, size=model_size or config["size"]), True)) as executor:
+            futures = {executor.submit(_transcribe_file, path, model_size): path for path in todo}
+            for future in as_completed(futures):
+                entry = {"file": os.path.relpath(futures[future], input_dir)}
+                entry.update(future.result())
+                manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                manifest.flush()
+
+                if "error" in entry:
+                    summary["failed"] += 1
+                else:
+                    summary["transcribed"] += 1
+                    summary["audio_seconds"] += entry["audio_seconds"]
+
+    summary["wall_seconds"] = time.perf_counter() - start
+    summary["throughput"] = summary["audio_seconds"] / summary["wall_seconds"] if summary["wall_seconds"] else 0.0
+    return summary
+
+def main(argv=None):
+    """Command-line entry point for batch transcription of a directory."""
+    parser = argparse.ArgumentParser(description="Transcribe a directory of audio files with Whisper.")
+    parser.add_argument("input_dir", help="Directory searched recursively for audio files")
+    parser.add_argument("-m", "--manifest", default="transcripts.jsonl", help="JSONL manifest to append to")
+    parser.add_argument("-p", "--pattern", default="*.wav", help="File name pattern")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Worker processes")
+    parser.add_argument("--model", help="Whisper model size (default: configured size)")
+    args = parser.parse_args(argv)
+
+    summary = transcribe_batch(args.input_dir, args.manifest, args.pattern, args.workers, args.model)
+    print(f"Transcribed {summary['transcribed']}, skipped {summary['skipped']}, "
+          f"failed {summary['failed']} of {summary['files']} files")
+    print(f"{summary['audio_seconds']:.1f} s of audio in {summary['wall_seconds']:.1f} s "
+          f"({summary['throughput']:.2f} audio-seconds per wall-second)")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,510 @@
-from googletrans import Translator
+import asyncio
+import bisect
+import hashlib
+import inspect
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from metrics import payload_bytes, timer
+
+# Get the current script directory
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# On-disk store shared by every run
+CACHE_PATH = os.path.join(script_dir, "corpus", "translation_cache.sqlite3")
+
+# Endpoint used by the batch client; point it at a local stand-in for testing
+TRANSLATE_URL = os.environ.get("MAITHILI_TRANSLATE_URL", "https://translate.googleapis.com/translate_a/single")
+
+# Offline phrase table: plain TSV source and the compiled, memory-mapped file
+PHRASE_TABLE_SOURCE = os.path.join(script_dir, "phrase_table.tsv")
+PHRASE_TABLE_PATH = os.path.join(script_dir, "corpus", "phrase_table.bin")
+PHRASE_TABLE_MAGIC = b"MPT1"
+
+# Longest phrase, in words, looked up by the offline backend
+MAX_PHRASE_WORDS = 4
+
+# Punctuation ignored when looking words up and carried over to the output
+PHRASE_PUNCTUATION = ".,?!;:\"'()।॥"
+
+# Upper bound on the characters sent in one batch request
+MAX_BATCH_CHARS = 4500
+
+# Pooled HTTP clients, kept per event loop and dropped along with it
+_clients = weakref.WeakKeyDictionary()
+
+# Sentence boundaries: whitespace after Latin or Devanagari sentence punctuation, or a newline
+_sentence_break = re.compile(r'(?<=[.!?।॥])\s+|\s*\n\s*')
+
+class TranslationCache:
+    """Content-addressed translation cache: an in-memory LRU in front of SQLite.
+
+    Entries are keyed by a SHA-256 of the source text and language pair, so
+    identical sentences are translated once per run and once ever.
+    """
+
+    def __init__(self, path=CACHE_PATH, capacity=4096):
+        self.path = path
+        self.capacity = capacity
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+    @staticmethod
+    def key(text, src, dest, backend="google"):
+        """Content hash identifying a translation request."""
+        return hashlib.sha256(f"{backend}\0{src}\0{dest}\0{text}".encode('utf-8')).hexdigest()
+
+    def _connect(self):
+        """Open the SQLite store on first use."""
+        if self._db is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, result TEXT NOT NULL)")
+        return self._db
+
+    def _remember(self, key, result):
+        """Insert into the LRU, evicting the oldest entry when full."""
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached translation for key, or None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return self._memory[key]
+
+            row = self._connect().execute("SELECT result FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["disk_hits"] += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, key, result):
+        """Store a translation in memory and on disk."""
+        with self._lock:
+            self._remember(key, result)
+            db = self._connect()
+            db.execute("INSERT OR REPLACE INTO translations (key, result) VALUES (?, ?)", (key, result))
+            db.commit()
+
+    def put_many(self, items):
+        """Store (key, translation) pairs in memory and on disk in one transaction."""
+        items = list(items)
+        if not items:
+            return
+        with self._lock:
+            for key, result in items:
+                self._remember(key, result)
+            db = self._connect()
+            db.executemany("INSERT OR REPLACE INTO translations (key, result) VALUES (?, ?)", items)
+            db.commit()
+
+    def stats(self):
+        """Hit/miss counters plus the current in-memory size."""
+        with self._lock:
+            return dict(self.counters, memory_entries=len(self._memory))
+
+# Shared by every caller in the process
+cache = TranslationCache()
+
+class TranslationBackend(ABC):
+    """Interface for translation backends selectable with set_backend()."""
+
+    name = None
+
+    @abstractmethod
+    def translate(self, text, src='auto', dest='en'):
+        """Translate one text."""
+
+    def translate_many(self, texts, src='auto', dest='en'):
+        """Translate a list of texts; backends may override with a faster path."""
+        return [self.translate(text, src, dest) for text in texts]
+
+class GoogleBackend(TranslationBackend):
+    """Online translation through googletrans, one Translator per process."""
+
+    name = "google"
+
+    def __init__(self):
+        self._translator = None
+
+    def translate(self, text, src='auto', dest='en'):
+        if self._translator is None:
+            from googletrans import Translator
+            self._translator = Translator()
+        return self._translator.translate(text, src=src, dest=dest).text
+
+    def translate_many(self, texts, src='auto', dest='en'):
+        return asyncio.run(_translate_remote(texts, src, dest))
+
+def compile_phrase_table(source_path=PHRASE_TABLE_SOURCE, table_path=PHRASE_TABLE_PATH):
+    """Compile a maithili<TAB>english TSV into a sorted binary phrase table.
+
+    Layout: magic, uint32 entry count, count + 1 uint64 record offsets, then
+    the records as UTF-8 "source\ttarget", sorted by source bytes.
+    """
+    entries = {}
+    with open(source_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            source, sep, target = line.rstrip('\n').partition('\t')
+            if sep and source.strip():
+                entries[_normalize_phrase(source)] = target.strip()
+
+    records = [f"{source}\t{target}".encode('utf-8') for source, target in entries.items()]
+    records.sort(key=lambda record: record.split(b'\t', 1)[0])
+    header = len(PHRASE_TABLE_MAGIC) + 4 + 8 * (len(records) + 1)
+    offsets = [header]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+
+    # Written aside and renamed into place: a table already memory-mapped
+    # elsewhere keeps its old file instead of seeing it truncated
+    os.makedirs(os.path.dirname(table_path), exist_ok=True)
+    tmp_path = f"{table_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(PHRASE_TABLE_MAGIC + struct.pack('<I', len(records)))
+        file.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+        file.writelines(records)
+    os.replace(tmp_path, table_path)
+
+def _normalize_phrase(phrase):
+    """Lowercase and collapse whitespace so lookups match the compiled keys."""
+    return " ".join(phrase.lower().split())
+
+class PhraseTable:
+    """Read-only view of a compiled phrase table through mmap, with binary search."""
+
+    def __init__(self, table_path=PHRASE_TABLE_PATH):
+        with open(table_path, 'rb') as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(PHRASE_TABLE_MAGIC)] != PHRASE_TABLE_MAGIC:
+            raise ValueError(f"Not a phrase table: {table_path}")
+        (self._count,) = struct.unpack_from('<I', self._data, len(PHRASE_TABLE_MAGIC))
+        self._offsets = len(PHRASE_TABLE_MAGIC) + 4
+
+    def __len__(self):
+        return self._count
+
+    def _record(self, i):
+        start, end = struct.unpack_from('<2Q', self._data, self._offsets + 8 * i)
+        return self._data[start:end].split(b'\t', 1)
+
+    def get(self, phrase):
+        """Return the translation of a normalized phrase, or None."""
+        key = phrase.encode('utf-8')
+        keys = _RecordKeys(self)
+        i = bisect.bisect_left(keys, key)
+        if i < self._count:
+            source, target = self._record(i)
+            if source == key:
+                return target.decode('utf-8')
+        return None
+
+class _RecordKeys:
+    """Sequence of phrase table keys, so bisect can search the mmap directly."""
+
+    def __init__(self, table):
+        self._table = table
+
+    def __len__(self):
+        return len(self._table)
+
+    def __getitem__(self, i):
+        return self._table._record(i)[0]
+
+class PhraseTableBackend(TranslationBackend):
+    """Offline dictionary/phrase-table translation at local CPU speed.
+
+    Words are translated greedily by the longest phrase (up to
+    MAX_PHRASE_WORDS words) found in the table; unknown words are kept.
+    Punctuation after the last word of a phrase is carried over.
+    The table is compiled from PHRASE_TABLE_SOURCE on first use if needed.
+    """
+
+    name = "offline"
+
+    def __init__(self, table_path=PHRASE_TABLE_PATH, source_path=PHRASE_TABLE_SOURCE):
+        self.table_path = table_path
+        self.source_path = source_path
+        self._table = None
+        self._lock = threading.Lock()
+
+    def _get_table(self):
+        # Executor threads share one backend; only the first compiles and maps the table
+        with self._lock:
+            if self._table is None:
+                stale = not os.path.exists(self.table_path) or (
+                    os.path.exists(self.source_path)
+                    and os.path.getmtime(self.source_path) > os.path.getmtime(self.table_path))
+                if stale:
+                    compile_phrase_table(self.source_path, self.table_path)
+                self._table = PhraseTable(self.table_path)
+            return self._table
+
+    def translate(self, text, src='auto', dest='en'):
+        table = self._get_table()
+        words = text.split()
+        keys = [word.lower().strip(PHRASE_PUNCTUATION) for word in words]
+        output = []
+        i = 0
+        while i < len(words):
+            for n in range(min(MAX_PHRASE_WORDS, len(words) - i), 0, -1):
+                target = table.get(" ".join(keys[i:i + n]))
+                if target is not None:
+                    last = words[i + n - 1]
+                    output.append(target + last[len(last.rstrip(PHRASE_PUNCTUATION)):])
+                    i += n
+                    break
+            else:
+                output.append(words[i])
+                i += 1
+        return " ".join(output)
+
+# Available backends by name
+BACKENDS = {}
+
+def register_backend(backend):
+    """Make a TranslationBackend subclass selectable by its name.
+
+    Raises TypeError if it is not a complete backend, so a missing method
+    shows up here rather than in the middle of a request.
+    """
+    if not (isinstance(backend, type) and issubclass(backend, TranslationBackend)):
+        raise TypeError(f"{backend!r} is not a TranslationBackend")
+    if inspect.isabstract(backend):
+        missing = ", ".join(sorted(backend.__abstractmethods__))
+        raise TypeError(f"Backend {backend.__name__} does not implement {missing}")
+    if not backend.name:
+        raise TypeError(f"Backend {backend.__name__} has no name")
+    BACKENDS[backend.name] = backend
+    return backend
+
+register_backend(GoogleBackend)
+register_backend(PhraseTableBackend)
+
+# Selected backend, created on first use
+_backend = None
+
+def set_backend(name):
+    """Select the translation backend ('google' or 'offline')."""
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown translation backend: {name}. Use one of {', '.join(BACKENDS)}")
+    _backend = BACKENDS[name]()
+    return _backend
+
+def get_backend():
+    """Return the selected backend, defaulting to MAITHILI_TRANSLATION_BACKEND or google."""
+    if _backend is None:
+        set_backend(os.environ.get("MAITHILI_TRANSLATION_BACKEND", "google"))
+    return _backend
 
 def translate_maithili_to_english(text):
-    translator = Translator()
-    result = translator.translate(text, src='auto', dest='en')  # Use 'auto' for language detection
-    return result.text
+    backend = get_backend()
+    key = TranslationCache.key(text, 'auto', 'en', backend.name)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    with timer(f"translate.{backend.name}", payload_bytes(text)):
+        result = backend.translate(text, src='auto', dest='en')  # Use 'auto' for language detection
+    cache.put(key, result)
+    return result
+
+def split_sentences(text):
+    """Split text into sentences and the separators around them.
+
+    Returns (sentences, separators) where separators[0] is any leading
+    whitespace and separators[i + 1] follows sentences[i] (the last one
+    holds any trailing whitespace), so interleaving them gives back the
+    original text.
+    """
+    begin = len(text) - len(text.lstrip())
+    end = begin + len(text[begin:].rstrip())
+    sentences, separators = [], [text[:begin]]
+    start = begin
+    for match in _sentence_break.finditer(text, begin, end):
+        sentences.append(text[start:match.start()])
+        separators.append(match.group())
+        start = match.end()
+    if start < end:
+        sentences.append(text[start:end])
+        separators.append(text[end:])
+    else:
+        separators[-1] += text[end:]
+    return sentences, separators
+
+def pack_batches(sentences, max_chars=MAX_BATCH_CHARS):
+    """Group sentence indices into batches whose newline-joined text fits max_chars.
+
+    A sentence longer than max_chars, or one containing a newline (which
+    would break the one-line-per-sentence mapping), gets a batch of its own.
+    """
+    batches, current, size = [], [], 0
+    for index, sentence in enumerate(sentences):
+        if "\n" in sentence:
+            if current:
+                batches.append(current)
+            batches.append([index])
+            current, size = [], 0
+            continue
+        if current and size + len(sentence) + 1 > max_chars:
+            batches.append(current)
+            current, size = [], 0
+        current.append(index)
+        size += len(sentence) + 1
+    if current:
+        batches.append(current)
+    return batches
+
+async def _request_batch(client, semaphore, text, src, dest, url, retries, backoff):
+    """Translate one newline-joined batch, retrying with exponential backoff."""
+    import httpx
+    async with semaphore:
+        for attempt in range(retries + 1):
+            try:
+                with timer("translate.batch_request", payload_bytes(text)):
+                    response = await client.post(
+                        url,
+                        params={"client": "gtx", "sl": src, "tl": dest, "dt": "t"},
+                        data={"q": text},
+                    )
+                response.raise_for_status()
+                return "".join(part[0] for part in response.json()[0] if part and part[0])
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = isinstance(e, httpx.TransportError) or e.response.status_code == 429 \
+                    or e.response.status_code >= 500
+                if not retryable or attempt == retries:
+                    raise
+                await asyncio.sleep(backoff * 2 ** attempt)
+
+async def _translate_lines(client, semaphore, sentences, src, dest, url, retries, backoff):
+    """Translate one batch of sentences sent as newline-joined lines.
+
+    If the translation comes back with a different number of lines, the
+    batch's sentences are requested again one at a time, so no sentence
+    ever gets a neighbour's text.
+    """
+    text = await _request_batch(client, semaphore, "\n".join(sentences), src, dest, url, retries, backoff)
+    if len(sentences) == 1:
+        return [text.strip()]
+    lines = text.split("\n")
+    if len(lines) == len(sentences):
+        return [line.strip() for line in lines]
+    singles = await asyncio.gather(*(
+        _request_batch(client, semaphore, sentence, src, dest, url, retries, backoff)
+        for sentence in sentences
+    ))
+    return [single.strip() for single in singles]
+
+def _get_client(concurrency):
+    """Return the running loop's pooled HTTP client for this concurrency."""
+    import httpx
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(concurrency)
+    if client is None or client.is_closed:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        client = clients[concurrency] = httpx.AsyncClient(limits=limits, timeout=30.0)
+    return client
+
+async def _translate_remote(sentences, src='auto', dest='en', concurrency=4, retries=3,
+                            backoff=0.5, max_chars=MAX_BATCH_CHARS, url=None):
+    """
+    Translate sentences with batched, concurrent requests to TRANSLATE_URL.
+
+    Sentences are packed into batches of at most max_chars and sent over the
+    event loop's pooled client with at most `concurrency` requests in flight.
+    Results come back in input order.
+    """
+    results = [None] * len(sentences)
+    batches = pack_batches(sentences, max_chars)
+    semaphore = asyncio.Semaphore(concurrency)
+    client = _get_client(concurrency)
+
+    translated = await asyncio.gather(*(
+        _translate_lines(client, semaphore, [sentences[i] for i in batch],
+                         src, dest, url or TRANSLATE_URL, retries, backoff)
+        for batch in batches
+    ))
+
+    for batch, lines in zip(batches, translated):
+        for index, line in zip(batch, lines):
+            results[index] = line
+    return results
+
+async def translate_batch_async(sentences, src='auto', dest='en', **options):
+    """
+    Translate a list of sentences, in order, with the selected backend.
+
+    Cached sentences are answered locally. For the google backend the rest
+    go through batched, concurrent requests (options: concurrency, retries,
+    backoff, max_chars, url); other backends translate them in-process.
+    Cache I/O and in-process backends run in the default executor, so the
+    event loop is never blocked on SQLite or the CPU.
+    """
+    loop = asyncio.get_running_loop()
+    backend = get_backend()
+    keys = [TranslationCache.key(sentence, src, dest, backend.name) for sentence in sentences]
+    results = await loop.run_in_executor(None, lambda: [cache.get(key) for key in keys])
+    todo = [index for index, result in enumerate(results) if result is None]
+    if not todo:
+        return results
+
+    # Translate each distinct sentence once, then copy it to every position
+    first = {}
+    for index in todo:
+        first.setdefault(keys[index], index)
+    pending = [sentences[i] for i in first.values()]
+    if isinstance(backend, GoogleBackend):
+        translated = await _translate_remote(pending, src, dest, **options)
+    else:
+        translated = await loop.run_in_executor(None, _translate_local, backend, pending, src, dest)
+
+    by_key = dict(zip(first, translated))
+    for index in todo:
+        results[index] = by_key[keys[index]]
+    await loop.run_in_executor(None, cache.put_many, list(by_key.items()))
+    return results
+
+def _translate_local(backend, texts, src, dest):
+    with timer(f"translate.{backend.name}", sum(payload_bytes(text) for text in texts)):
+        return backend.translate_many(texts, src, dest)
+
+async def translate_texts_async(texts, src='auto', dest='en', **options):
+    """
+    Translate whole texts, in order, sentence by sentence.
+
+    The sentences of all texts are translated together with
+    translate_batch_async, then each text is put back together with its
+    own separators, so every result holds only its own text's sentences.
+    """
+    splits = [split_sentences(text) for text in texts]
+    translated = await translate_batch_async(
+        [sentence for sentences, _ in splits for sentence in sentences], src, dest, **options)
+    results, start = [], 0
+    for sentences, separators in splits:
+        own = translated[start:start + len(sentences)]
+        start += len(sentences)
+        results.append(separators[0] + "".join(
+            sentence + separator for sentence, separator in zip(own, separators[1:])))
+    return results
+
+def translate_document(text, src='auto', dest='en', **options):
+    """Translate a long document sentence by sentence; see translate_texts_async."""
+    return asyncio.run(translate_texts_async([text], src, dest, **options))[0]
@@ -1,4 +1,10 @@
 # Enhanced Roman to Devanagari and Devanagari to Roman Transliteration System
+import argparse
+import re
+import sys
+
+from metrics import instrument, payload_bytes
+from parallel import ordered_map
 
 # Roman to Devanagari mappings with more complete character coverage
 roman_to_devanagari = {
@@ -67,151 +73,141 @@ conjuncts = {
     'क्ष': 'ksh', 'त्र': 'tr', 'ज्ञ': 'gn'
 }
 
+# Characters copied through unchanged that also end a word for halant purposes
+roman_punctuation = " ,.?!-;:\"'()[]{}"
+
+# Roman tokens that are vowels, i.e. never take a matra or halant
+roman_vowels = ['a', 'aa', 'i', 'ii', 'u', 'uu', 'e', 'ai', 'o', 'au', 'ri']
+
+def _longest_match_pattern(keys):
+    """Alternation over keys, longest first, so a match is the longest key."""
+    return '|'.join(re.escape(key) for key in sorted(keys, key=len, reverse=True))
+
+# Compiled once: splits lowercase Roman text into punctuation, mapping tokens
+# (longest match) and any other single character, in one left-to-right pass
+_roman_tokenizer = re.compile(
+    '[' + re.escape(roman_punctuation) + ']|'
+    + _longest_match_pattern(roman_to_devanagari) + '|.',
+    re.DOTALL,
+)
+
+# Consonant tokens (anything mapped that is not a vowel or punctuation)
+_roman_consonants = {
+    token: devanagari for token, devanagari in roman_to_devanagari.items()
+    if token not in roman_vowels and token not in roman_punctuation
+}
+
+# Compiled once: conjuncts, tried in dict order like the character loop did
+_conjunct_pattern = re.compile('|'.join(re.escape(conjunct) for conjunct in conjuncts))
+
+# Single-character table; a halant after a consonant contributes nothing either way
+_devanagari_table = str.maketrans(
+    {char: roman for char, roman in devanagari_to_roman.items() if len(char) == 1}
+)
+
+# Runs of Devanagari characters and of Roman letters, for detect_script
+_devanagari_run = re.compile('[\u0900-\u097F]+')
+_roman_run = re.compile('[A-Za-z]+')
+
+# Compiled once: splits text into script runs in one left-to-right pass. A
+# Devanagari run spans Devanagari characters and anything but Roman letters
+# between them; everything else (Roman letters with the spaces, digits and
+# punctuation around them) is a Roman run
+_script_runs = re.compile('([\u0900-\u097F](?:[^A-Za-z]*[\u0900-\u097F])?)|[^\u0900-\u097F]+')
+
 def roman_to_devanagari_transliterate(text):
     """Convert Roman script to Devanagari with proper handling of vowel matras"""
-    output = ""
+    tokens = _roman_tokenizer.findall(text.lower())  # Lowercase for matching
+    output = []
+    append = output.append
+    count = len(tokens)
     i = 0
-    text = text.lower()  # Convert to lowercase for matching
-    
-    while i < len(text):
-        # Skip spaces and special characters
-        if text[i] == ' ' or text[i] in ",.?!-;:\"'()[]{}":
-            output += text[i]
+
+    while i < count:
+        token = tokens[i]
+        consonant = _roman_consonants.get(token)
+
+        if consonant is None:
+            # Vowels convert directly; punctuation and unknown characters are kept
+            append(token if token in roman_punctuation else roman_to_devanagari.get(token, token))
             i += 1
-            continue
-        
-        # Check for 3-character matches (like 'chh', 'ksh')
-        if i + 2 < len(text) and text[i:i+3] in roman_to_devanagari:
-            current_token = text[i:i+3]
-            token_length = 3
-        # Check for 2-character matches (like 'aa', 'kh', 'gh')
-        elif i + 1 < len(text) and text[i:i+2] in roman_to_devanagari:
-            current_token = text[i:i+2]
-            token_length = 2
-        # Check for single character matches
-        elif text[i] in roman_to_devanagari:
-            current_token = text[i]
-            token_length = 1
-        # If no match, keep character as-is
-        else:
-            output += text[i]
+        elif i + 1 == count:
+            # Implicit 'a' sound at the end - just add the consonant
+            append(consonant)
             i += 1
-            continue
-        
-        # Process consonant + vowel combinations
-        # If current token is a consonant and next token is a vowel
-        if (current_token in roman_to_devanagari and 
-            current_token not in ['a', 'aa', 'i', 'ii', 'u', 'uu', 'e', 'ai', 'o', 'au', 'ri'] and
-            i + token_length < len(text)):
-            
-            # Check for vowel after the consonant
-            next_pos = i + token_length
-            
-            # Check for 2-character vowels (aa, ii, etc.)
-            if next_pos + 1 < len(text) and text[next_pos:next_pos+2] in vowel_matras:
-                vowel = text[next_pos:next_pos+2]
-                vowel_length = 2
-            # Check for single-character vowels (a, i, etc.)
-            elif next_pos < len(text) and text[next_pos] in vowel_matras:
-                vowel = text[next_pos]
-                vowel_length = 1
-            else:
-                vowel = None
-                vowel_length = 0
-            
-            # Apply the consonant + vowel matra
-            if vowel:
-                output += roman_to_devanagari[current_token] + vowel_matras[vowel]
-                i += token_length + vowel_length
-            else:
-                # If no vowel follows, add halant (्) for pure consonant unless followed by another consonant
-                # Check if next character is a space or the end of the string
-                if next_pos >= len(text) or text[next_pos] == ' ' or text[next_pos] in ",.?!-;:\"'()[]{}":
-                    # Implicit 'a' sound at the end - just add the consonant
-                    output += roman_to_devanagari[current_token]
-                else:
-                    # Add halant to suppress the inherent 'a' sound
-                    output += roman_to_devanagari[current_token] + '्'
-                i += token_length
         else:
-            # Direct conversion for vowels and other characters
-            output += roman_to_devanagari[current_token]
-            i += token_length
-    
-    return output
+            following = tokens[i + 1]
+            matra = vowel_matras.get(following)
+            if matra is not None:
+                # Apply the consonant + vowel matra
+                append(consonant + matra)
+                i += 2
+            elif following in roman_punctuation:
+                append(consonant)
+                i += 1
+            else:
+                # Add halant to suppress the inherent 'a' sound
+                append(consonant + '्')
+                i += 1
+
+    return ''.join(output)
 
 def devanagari_to_roman_transliterate(text):
     """Convert Devanagari script to Roman with better handling of conjuncts and vowel matras"""
-    output = ""
-    i = 0
-    last_was_consonant = False
-    
-    while i < len(text):
-        # Check for specific conjuncts first (like क्ष, त्र)
-        found_conjunct = False
-        for conjunct, roman in conjuncts.items():
-            if i + len(conjunct) <= len(text) and text[i:i+len(conjunct)] == conjunct:
-                output += roman
-                i += len(conjunct)
-                last_was_consonant = True
-                found_conjunct = True
-                break
-        
-        if found_conjunct:
-            continue
-        
-        # Check for halant (consonant without vowel)
-        if i + 1 < len(text) and text[i+1] == '्':
-            if text[i] in devanagari_to_roman:
-                output += devanagari_to_roman[text[i]]
-                i += 2  # Skip the consonant and halant
-                last_was_consonant = True
-                continue
-        
-        # Handle regular characters
-        if text[i] in devanagari_to_roman:
-            # If current character is vowel matra and previous output ended with consonant
-            if text[i] in 'ािीुूृेैोौं' and last_was_consonant:
-                output += devanagari_to_roman[text[i]]
-            else:
-                # For standalone characters
-                output += devanagari_to_roman[text[i]]
-                # Reset consonant flag if this is a vowel matra
-                last_was_consonant = text[i] not in 'ािीुूृेैोौं'
-            i += 1
-        else:
-            # Keep non-Devanagari characters as is
-            output += text[i]
-            last_was_consonant = False
-            i += 1
-    
-    return output
+    # Conjuncts first (like क्ष, त्र), then every remaining character by table
+    text = _conjunct_pattern.sub(lambda match: conjuncts[match.group()], text)
+    return text.translate(_devanagari_table)
 
 def detect_script(text):
     """Detect whether text is predominantly in Devanagari or Roman script"""
-    devanagari_count = sum(1 for char in text if ord(char) >= 0x0900 and ord(char) <= 0x097F)
-    roman_count = sum(1 for char in text if (ord(char) >= 0x0041 and ord(char) <= 0x005A) or 
-                                          (ord(char) >= 0x0061 and ord(char) <= 0x007A))
-    
+    devanagari_count = sum(map(len, _devanagari_run.findall(text)))
+    roman_count = sum(map(len, _roman_run.findall(text)))
+
     if devanagari_count > roman_count:
         return 'devanagari'
     else:
         return 'roman'
 
+def segment_scripts(text):
+    """Split text into (script, run) pairs, script being 'devanagari' or 'roman'.
+
+    Joining the runs gives back text; spaces and punctuation between two
+    Devanagari runs stay with them, all other neutral characters go with
+    the Roman run they touch.
+    """
+    return [('devanagari' if match.group(1) else 'roman', match.group())
+            for match in _script_runs.finditer(text)]
+
+def mixed_transliterate(text):
+    """Convert each script run to the other script in a single pass over text,
+    so mixed input like 'नमस्ते my friend' keeps both halves intact."""
+    return ''.join(
+        devanagari_to_roman_transliterate(match.group()) if match.group(1)
+        else roman_to_devanagari_transliterate(match.group())
+        for match in _script_runs.finditer(text)
+    )
+
+@instrument("transliteration.text_transliterate", size=lambda text, direction=None: payload_bytes(text))
 def text_transliterate(text, direction=None):
     """
     Bidirectional transliteration function with auto-detection.
     
     Args:
         text (str): Text to transliterate
-        direction (str, optional): Conversion direction. If None, auto-detects.
-                                  Options: 'roman_to_devanagari', 'devanagari_to_roman'
+        direction (str, optional): Conversion direction. If None (or 'mixed'),
+                                  each script run is detected and converted
+                                  separately, so mixed text keeps both halves.
+                                  Options: 'roman_to_devanagari', 'devanagari_to_roman',
+                                  'mixed', 'auto' (one direction for the whole text)
     
     Returns:
         str: Transliterated text
     """
-    # Auto-detect if direction is not specified
-    if direction is None:
+    # Auto-detect per script run if direction is not specified
+    if direction is None or direction == 'mixed':
+        return mixed_transliterate(text)
+
+    if direction == 'auto':
         detected_script = detect_script(text)
         direction = 'devanagari_to_roman' if detected_script == 'devanagari' else 'roman_to_devanagari'
     
@@ -220,21 +216,75 @@ def text_transliterate(text, direction=None):
     elif direction == 'devanagari_to_roman':
         return devanagari_to_roman_transliterate(text)
     else:
-        return "Invalid direction. Use 'roman_to_devanagari', 'devanagari_to_roman', or None for auto-detection."
-
-# Example Usage:
-# if __name__ == "__main__":
-       
-#     # Auto-detection example
-#     mixed_examples = [
-#         "नमस्ते my friend मुझे हिंदी सीखना पसंद है"
-#     ]
-    
-#     print("=== Auto-detection Examples ===")
-#     for example in mixed_examples:
-#         result = transliterate_text(example)  # Auto-detect direction
-#         print(f"Input: {example}")
-#         print(f"Output: {result}")
-#         print(f"Detected: {detect_script(example)}")
-#         print()
+        return "Invalid direction. Use 'roman_to_devanagari', 'devanagari_to_roman', 'mixed', 'auto', or None for auto-detection."
+
+def _transliterate_lines(lines, direction):
+    """Transliterate a batch of lines, keeping each line ending as-is."""
+    output = []
+    for line in lines:
+        body = line.rstrip('\r\n')
+        output.append(text_transliterate(body, direction) + line[len(body):])
+    return output
+
+def _line_batches(lines, batch_size):
+    """Groups an iterable of lines into lists of at most batch_size lines."""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def transliterate_stream(infile, outfile, direction=None, workers=1, batch_lines=2000):
+    """
+    Transliterate a text stream line by line with bounded memory.
+
+    Args:
+        infile: Iterable of lines, e.g. an open text file or sys.stdin
+        outfile: Writable text stream for the results
+        direction (str, optional): As for text_transliterate; None converts each script run separately
+        workers (int): Worker processes; batches are written back in input order
+        batch_lines (int): Lines sent to a worker at a time
+
+    Returns:
+        int: Number of lines written
+    """
+    written = 0
+    batches = ((batch, direction) for batch in _line_batches(infile, batch_lines))
+    for result in ordered_map(_transliterate_lines, batches, workers):
+        outfile.writelines(result)
+        written += len(result)
+    return written
+
+def transliterate_file(input_path, output_path, direction=None, workers=1, batch_lines=2000):
+    """Transliterate a UTF-8 text file into output_path; see transliterate_stream."""
+    with open(input_path, 'r', encoding='utf-8', newline='') as infile, \
+            open(output_path, 'w', encoding='utf-8', newline='') as outfile:
+        return transliterate_stream(infile, outfile, direction, workers, batch_lines)
+
+def main(argv=None):
+    """Command-line entry point for bulk file or stdin transliteration."""
+    parser = argparse.ArgumentParser(description="Transliterate Maithili text between Roman and Devanagari.")
+    parser.add_argument("input", nargs="?", help="Input text file (default: stdin)")
+    parser.add_argument("-o", "--output", help="Output text file (default: stdout)")
+    parser.add_argument("-d", "--direction", choices=["roman_to_devanagari", "devanagari_to_roman", "mixed", "auto"],
+                        help="Conversion direction; 'auto' picks one direction per line "
+                             "(default: convert each script run, same as 'mixed')")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Worker processes")
+    parser.add_argument("--batch-lines", type=int, default=2000, help="Lines per worker batch")
+    args = parser.parse_args(argv)
+
+    infile = open(args.input, 'r', encoding='utf-8', newline='') if args.input else sys.stdin
+    outfile = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        transliterate_stream(infile, outfile, args.direction, args.workers, args.batch_lines)
+    finally:
+        if args.input:
+            infile.close()
+        if args.output:
+            outfile.close()
 
+if __name__ == "__main__":
+    main()
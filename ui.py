@@ -3,11 +3,11 @@ from tkinter import ttk, filedialog, messagebox, scrolledtext
 from PIL import Image, ImageTk
 import pytesseract
 import os
-from ocr import extract_text_from_image
-from transliteration import text_transliterate
-from code_mixed import process_mixed_corpus
-from stt import audio
-from translate import translate_maithili_to_english 
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from metrics import format_breakdown
+from pipeline import build_default_pipeline, make_source
 
 class TranslationApp:
     def __init__(self, root):
@@ -19,6 +19,14 @@ class TranslationApp:
         self.current_input_mode = "Text"
         self.selected_file_path = None
         
+        # Background processing: one job at a time, results handed back through a queue
+        self.pipeline = build_default_pipeline()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.results_queue = queue.Queue()
+        self.cancel_event = None
+        self.job_id = 0
+        self.polling = False
+        
         # Set theme and colors
         self.style = ttk.Style()
         self.primary_color = "#3498db"
@@ -116,8 +124,14 @@ class TranslationApp:
         
         ttk.Button(process_frame, text="Clear", command=self.clear_input).pack(side=tk.LEFT)
         
-        process_button = ttk.Button(process_frame, text="Process", command=self.process_input)
-        process_button.pack(side=tk.RIGHT)
+        self.process_button = ttk.Button(process_frame, text="Process", command=self.process_input)
+        self.process_button.pack(side=tk.RIGHT)
+        
+        self.cancel_button = ttk.Button(process_frame, text="Cancel", command=self.cancel_processing, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT, padx=5)
+        
+        self.progress = ttk.Progressbar(process_frame, mode="determinate", length=200)
+        self.progress.pack(side=tk.RIGHT, padx=5)
         
         # Output section
         output_frame = ttk.LabelFrame(main_frame, text="Output", padding=10)
@@ -287,46 +301,121 @@ class TranslationApp:
             if not self.selected_file_path:
                 messagebox.showwarning("No File", f"Please select a file for {mode} input.")
                 return
-                
-            # Mock extraction based on mode
-            if mode == "Speech":
-                input_text = audio(self.selected_file_path)
-            else:  # Image
-                try:
-                    input_text = extract_text_from_image(self.selected_file_path)
-                except Exception as e:
-                    messagebox.showerror("OCR Error", f"Error processing image: {str(e)}")
-                    return
-                    
-        # Display raw input
-        self.raw_output.delete("1.0", tk.END)
-        self.raw_output.insert("1.0", input_text)
-        
-        # Process based on selected options
-        if self.transliterate_var.get():
-            transliterated = text_transliterate(input_text)
-            self.transliteration_output.delete("1.0", tk.END)
-            self.transliteration_output.insert("1.0", transliterated)
+            input_text = None
             
-        if self.code_mix_var.get():
-            code_mixed = process_mixed_corpus(input_text)
-            self.code_mix_output.delete("1.0", tk.END)
-            self.code_mix_output.insert("1.0", code_mixed)
-            
-        if self.translate_var.get():
-            translated = translate_maithili_to_english(input_text)
-            self.translation_output.delete("1.0", tk.END)
-            self.translation_output.insert("1.0", translated)
+        # Snapshot the options on the main thread; the worker never touches Tk
+        options = {
+            "transliterate": self.transliterate_var.get(),
+            "code_mix": self.code_mix_var.get(),
+            "translate": self.translate_var.get(),
+            "clean_english": self.clean_english_var.get(),
+        }
+        stages = 1 + sum(options.values())
+        
+        self.clear_output()
+        self.job_id += 1
+        self.cancel_event = threading.Event()
+        self.progress.configure(maximum=stages, value=0)
+        self.process_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.status_var.set("Processing...")
+        
+        self.executor.submit(self.run_job, self.job_id, self.cancel_event, mode,
+                             self.selected_file_path, input_text, options)
+        if not self.polling:
+            self.polling = True
+            self.root.after(50, self.poll_results)
+        
+    def run_job(self, job_id, cancel_event, mode, file_path, input_text, options):
+        """Run the pipeline off the Tk thread, posting each stage result as it finishes"""
+        post = lambda *message: self.results_queue.put((job_id,) + message)
+        outputs = {
+            "raw": self.raw_output,
+            "transliterate": self.transliteration_output,
+            "code_mix": self.code_mix_output,
+            "translate": self.translation_output,
+            "clean_english": self.clean_english_output,
+        }
+        
+        try:
+            source = make_source(mode, text=input_text, path=file_path if mode != "Text" else None)
+            if mode == "Speech":
+                post("status", "Transcribing audio...")
+            elif mode == "Image":
+                post("status", "Running OCR...")
+                
+            # Independent stages run concurrently; each tab fills in as its stage finishes
+            targets = ["raw"] + [name for name, enabled in options.items() if enabled]
+            timings = {}
+            results, errors = self.pipeline.run(
+                {"source": source}, targets,
+                on_result=lambda name, value: post("stage", outputs[name], value) if name in targets else None,
+                cancel_event=cancel_event,
+                timings=timings,
+            )
+        except Exception as e:
+            post("error", "Processing Error", str(e))
+            return
             
-        if self.clean_english_var.get():
-            clean_english = translate_maithili_to_english(input_text)
-            self.clean_english_output.delete("1.0", tk.END)
-            self.clean_english_output.insert("1.0", clean_english)
+        if cancel_event.is_set():
+            post("cancelled")
+        elif "raw" in errors and mode == "Image":
+            post("error", "OCR Error", f"Error processing image: {str(errors['raw'])}")
+        elif errors:
+            name, error = next(iter(errors.items()))
+            post("error", "Processing Error", f"{name}: {str(error)}")
+        else:
+            post("done", format_breakdown(timings))
+        
+    def poll_results(self):
+        """Apply finished stage results on the Tk thread"""
+        finished = False
+        while True:
+            try:
+                job_id, kind, *payload = self.results_queue.get_nowait()
+            except queue.Empty:
+                break
+            if job_id != self.job_id:
+                continue  # Result of a cancelled job
+            if kind == "status":
+                self.status_var.set(payload[0])
+            elif kind == "stage":
+                widget, text = payload
+                widget.delete("1.0", tk.END)
+                widget.insert("1.0", text)
+                self.progress.step(1)
+            elif kind == "error":
+                messagebox.showerror(*payload)
+                self.status_var.set("Processing failed")
+                finished = True
+            elif kind == "cancelled":
+                self.status_var.set("Processing cancelled")
+                finished = True
+            elif kind == "done":
+                self.output_notebook.select(0)  # Show raw output first
+                self.status_var.set(f"Processing complete — {payload[0]}")
+                finished = True
+                
+        if finished:
+            self.finish_processing()
+        if self.process_button.instate([tk.DISABLED]):
+            self.root.after(50, self.poll_results)
+        else:
+            self.polling = False
             
-        # Switch to output tab
-        self.output_notebook.select(0)  # Show raw output first
-        
-        self.status_var.set("Processing complete")
+    def cancel_processing(self):
+        """Cancel the running job; a stage already running is left to finish and discarded"""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.job_id += 1
+        self.status_var.set("Processing cancelled")
+        self.finish_processing()
+        
+    def finish_processing(self):
+        """Re-enable the controls after a job ends"""
+        self.process_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        self.progress.configure(value=0)
         
     def clear_output(self):
         """Clear all output fields"""